@@ -1,9 +1,25 @@
+import argparse
+import functools
+import glob
+import hashlib
+import io
+import json
 import os
+import re
+import sys
+import threading
+import time
 import tkinter as tk
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from tkinter import ttk, filedialog, messagebox
 from decimal import Decimal, getcontext
 
+import numpy as np
 import pandas as pd
+import shapely
 from shapely import affinity
 from shapely.geometry import Polygon
 from shapely.ops import unary_union
@@ -12,7 +28,9 @@ from shapely.strtree import STRtree
 import matplotlib
 matplotlib.use("TkAgg")
 import matplotlib.patheffects as pe
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.collections import PolyCollection
 from matplotlib.figure import Figure
 from matplotlib.patches import Polygon as MplPolygon
 
@@ -26,6 +44,87 @@ class ParticipantVisibleError(Exception):
     pass
 
 
+def _template_polygon():
+    """The unrotated tree polygon (scaled), built from exact Decimal dimensions."""
+    trunk_w = Decimal("0.15")
+    trunk_h = Decimal("0.2")
+    base_w = Decimal("0.7")
+    mid_w = Decimal("0.4")
+    top_w = Decimal("0.25")
+    tip_y = Decimal("0.8")
+    tier_1_y = Decimal("0.5")
+    tier_2_y = Decimal("0.25")
+    base_y = Decimal("0.0")
+    trunk_bottom_y = -trunk_h
+
+    return Polygon(
+        [
+            (Decimal("0.0") * scale_factor, tip_y * scale_factor),
+            (top_w / Decimal("2") * scale_factor, tier_1_y * scale_factor),
+            (top_w / Decimal("4") * scale_factor, tier_1_y * scale_factor),
+            (mid_w / Decimal("2") * scale_factor, tier_2_y * scale_factor),
+            (mid_w / Decimal("4") * scale_factor, tier_2_y * scale_factor),
+            (base_w / Decimal("2") * scale_factor, base_y * scale_factor),
+            (trunk_w / Decimal("2") * scale_factor, base_y * scale_factor),
+            (trunk_w / Decimal("2") * scale_factor, trunk_bottom_y * scale_factor),
+            (-(trunk_w / Decimal("2")) * scale_factor, trunk_bottom_y * scale_factor),
+            (-(trunk_w / Decimal("2")) * scale_factor, base_y * scale_factor),
+            (-(base_w / Decimal("2")) * scale_factor, base_y * scale_factor),
+            (-(mid_w / Decimal("4")) * scale_factor, tier_2_y * scale_factor),
+            (-(mid_w / Decimal("2")) * scale_factor, tier_2_y * scale_factor),
+            (-(top_w / Decimal("4")) * scale_factor, tier_1_y * scale_factor),
+            (-(top_w / Decimal("2")) * scale_factor, tier_1_y * scale_factor),
+        ]
+    )
+
+
+TEMPLATE_POLYGON = _template_polygon()
+TEMPLATE_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _rotated_template(angle: str) -> np.ndarray:
+    """
+    Exterior coords (scaled, closed ring) of the template rotated by `angle` degrees.
+    Keyed by the exact angle string, so repeated angles only need a translation.
+    Module-level: shared by every group and every load within the process.
+    """
+    rotated = affinity.rotate(TEMPLATE_POLYGON, float(Decimal(angle)), origin=(0, 0))
+    coords = np.asarray(rotated.exterior.coords, dtype=np.float64)
+    coords.setflags(write=False)
+    return coords
+
+
+def _rotated_rings(deg) -> np.ndarray:
+    """
+    Exterior coords (scaled, closed rings) of the template rotated by each angle in
+    `deg` (floats), as one (N, 16, 2) array. Same arithmetic as affinity.rotate, so
+    the result is bit-identical to _rotated_template; for files with many distinct
+    angles, where the per-angle cache cannot help.
+    """
+    theta = np.asarray(deg, dtype=np.float64) * np.pi / 180.0
+    c, s = np.cos(theta), np.sin(theta)
+    c[np.abs(c) < 2.5e-16] = 0.0
+    s[np.abs(s) < 2.5e-16] = 0.0
+    ring = np.asarray(TEMPLATE_POLYGON.exterior.coords, dtype=np.float64)
+    px, py = ring[:, 0], ring[:, 1]
+    c, s = c[:, None], s[:, None]
+    return np.stack([c * px + (-s) * py + 0.0, s * px + c * py + 0.0], axis=-1)
+
+
+def template_cache_info():
+    """Hit / miss counters of the rotated-template cache."""
+    info = _rotated_template.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+        "hit_rate": info.hits / lookups if lookups else 0.0,
+    }
+
+
 class ChristmasTree:
     """Represents a single, rotatable Christmas tree of a fixed size."""
 
@@ -34,46 +133,133 @@ class ChristmasTree:
         self.center_y = Decimal(center_y)
         self.angle = Decimal(angle)
 
-        trunk_w = Decimal("0.15")
-        trunk_h = Decimal("0.2")
-        base_w = Decimal("0.7")
-        mid_w = Decimal("0.4")
-        top_w = Decimal("0.25")
-        tip_y = Decimal("0.8")
-        tier_1_y = Decimal("0.5")
-        tier_2_y = Decimal("0.25")
-        base_y = Decimal("0.0")
-        trunk_bottom_y = -trunk_h
-
-        initial_polygon = Polygon(
-            [
-                (Decimal("0.0") * scale_factor, tip_y * scale_factor),
-                (top_w / Decimal("2") * scale_factor, tier_1_y * scale_factor),
-                (top_w / Decimal("4") * scale_factor, tier_1_y * scale_factor),
-                (mid_w / Decimal("2") * scale_factor, tier_2_y * scale_factor),
-                (mid_w / Decimal("4") * scale_factor, tier_2_y * scale_factor),
-                (base_w / Decimal("2") * scale_factor, base_y * scale_factor),
-                (trunk_w / Decimal("2") * scale_factor, base_y * scale_factor),
-                (trunk_w / Decimal("2") * scale_factor, trunk_bottom_y * scale_factor),
-                (-(trunk_w / Decimal("2")) * scale_factor, trunk_bottom_y * scale_factor),
-                (-(trunk_w / Decimal("2")) * scale_factor, base_y * scale_factor),
-                (-(base_w / Decimal("2")) * scale_factor, base_y * scale_factor),
-                (-(mid_w / Decimal("4")) * scale_factor, tier_2_y * scale_factor),
-                (-(mid_w / Decimal("2")) * scale_factor, tier_2_y * scale_factor),
-                (-(top_w / Decimal("4")) * scale_factor, tier_1_y * scale_factor),
-                (-(top_w / Decimal("2")) * scale_factor, tier_1_y * scale_factor),
-            ]
+        rotated = _rotated_template(str(angle))
+        self.polygon = Polygon(
+            rotated + (float(self.center_x * scale_factor), float(self.center_y * scale_factor))
         )
 
-        rotated = affinity.rotate(initial_polygon, float(self.angle), origin=(0, 0))
-        self.polygon = affinity.translate(
-            rotated,
-            xoff=float(self.center_x * scale_factor),
-            yoff=float(self.center_y * scale_factor),
-        )
+
+class ParsedSubmission:
+    """
+    Column arrays of a validated submission.
+
+    x / y / deg are float64; x_str / y_str / deg_str are the exact values with the
+    's' prefix removed (numpy unicode arrays, suitable for Decimal parsing).
+    """
+
+    def __init__(self, index, ids, groups, x_str, y_str, deg_str, x, y, deg):
+        self.index = index
+        self.ids = ids
+        self.groups = groups
+        self.x_str = x_str
+        self.y_str = y_str
+        self.deg_str = deg_str
+        self.x = x
+        self.y = y
+        self.deg = deg
+        self._group_slices = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def group_slices(self):
+        """dict[group -> row positions], groups sorted like DataFrame.groupby, rows kept in file order."""
+        if self._group_slices is None:
+            codes, uniq = pd.factorize(self.groups)
+            rank = np.argsort(uniq, kind="stable")
+            inverse = np.empty_like(rank)
+            inverse[rank] = np.arange(len(rank))
+            inverse = inverse[codes]
+            uniq = uniq[rank]
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.searchsorted(inverse[order], np.arange(len(uniq) + 1))
+            self._group_slices = {
+                str(g): order[bounds[k]:bounds[k + 1]] for k, g in enumerate(uniq)
+            }
+        return self._group_slices
+
+
+def _bad_rows_sample(index, mask, values, limit=5):
+    pos = np.flatnonzero(mask)[:limit]
+    return [(index[p], str(values[p])) for p in pos]
+
+
+def _strip_s_column(df: pd.DataFrame, c: str):
+    """
+    Vectorized 's' prefix check + strip for one column.
+    Returns (exact strings without the prefix, float64 values).
+    """
+    raw = df[c].to_numpy()
+    arr = raw.astype(str) if raw.dtype.kind != "U" else raw
+    n = len(arr)
+    width = arr.dtype.itemsize // 4
+
+    if n == 0:
+        return np.array([], dtype="U1"), np.array([], dtype=np.float64)
+    if width <= 1:
+        bad = arr != "s"
+        stripped = np.full(n, "", dtype="U1")
+    else:
+        # fixed-width unicode viewed as a (n, width) char matrix: no per-value Python work
+        chars = arr.view("U1").reshape(n, width)
+        bad = chars[:, 0] != "s"
+        stripped = np.ascontiguousarray(chars[:, 1:]).view(f"U{width - 1}").reshape(n)
+
+    if bad.any():
+        sample = _bad_rows_sample(df.index, bad, arr)
+        raise ParticipantVisibleError(f"列 {c} 存在未带 's' 前缀的值，例如（行, 值）：{sample}")
+
+    try:
+        # float() over the unicode buffer is faster than numpy's own U -> float64 cast
+        values = np.fromiter(map(float, stripped.tolist()), dtype=np.float64, count=n)
+    except ValueError:
+        coerced = pd.to_numeric(pd.Series(stripped), errors="coerce").to_numpy()
+        sample = _bad_rows_sample(df.index, np.isnan(coerced) & (stripped != "nan"), arr)
+        raise ParticipantVisibleError(f"列 {c} 存在无法解析为数字的值，例如（行, 值）：{sample}")
+    return stripped, values
+
+
+def parse_submission(df: pd.DataFrame) -> ParsedSubmission:
+    """
+    One-pass parser for the 's'-prefixed submission format: checks the columns,
+    the 's' prefix and the [-100, 100] limits with array operations.
+    """
+    required = ["id", "x", "y", "deg"]
+    for c in required:
+        if c not in df.columns:
+            raise ParticipantVisibleError(f"CSV 缺少列：{c}")
+
+    x_str, x = _strip_s_column(df, "x")
+    y_str, y = _strip_s_column(df, "y")
+    deg_str, deg = _strip_s_column(df, "deg")
+
+    # enforce limits
+    limit = 100
+    out = (x < -limit) | (x > limit) | (y < -limit) | (y > limit)
+    if out.any():
+        pos = np.flatnonzero(out)[:5]
+        sample = [(df.index[p], f"s{x_str[p]}", f"s{y_str[p]}") for p in pos]
+        raise ParticipantVisibleError(f"x 或 y 超出 [-100, 100] 限制，例如（行, x, y）：{sample}")
+
+    ids = df["id"].to_numpy().astype(str)
+    # group id prefix
+    groups = np.char.partition(ids, "_")[:, 0] if len(ids) else ids
+    return ParsedSubmission(df.index, ids, groups, x_str, y_str, deg_str, x, y, deg)
 
 
 def _strip_s_prefix_and_validate(df: pd.DataFrame) -> pd.DataFrame:
+    parsed = parse_submission(df)
+
+    df = df.copy().astype(str)
+    df["x"] = parsed.x_str
+    df["y"] = parsed.y_str
+    df["deg"] = parsed.deg_str
+    df["tree_count_group"] = parsed.groups
+    return df
+
+
+def _legacy_strip_s_prefix_and_validate(df: pd.DataFrame) -> pd.DataFrame:
+    """Previous column-by-column string implementation; kept for `bench-parse`."""
     required = ["id", "x", "y", "deg"]
     for c in required:
         if c not in df.columns:
@@ -99,6 +285,22 @@ def _strip_s_prefix_and_validate(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def bench_parse(submission_raw: pd.DataFrame, repeat: int = 5):
+    """
+    Times the legacy DataFrame validation against parse_submission (best of `repeat`).
+    Returns dict[name -> seconds].
+    """
+    timings = {}
+    for name, fn in (("legacy", _legacy_strip_s_prefix_and_validate), ("vectorized", parse_submission)):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn(submission_raw)
+            best = min(best, time.perf_counter() - t0)
+        timings[name] = best
+    return timings
+
+
 def _strtree_indices(tree: STRtree, query_geom, geom_list):
     """
     Shapely STRtree query return compatibility helper:
@@ -109,8 +311,8 @@ def _strtree_indices(tree: STRtree, query_geom, geom_list):
     if len(res) == 0:
         return []
     first = res[0]
-    if isinstance(first, (int,)):
-        return list(res)
+    if isinstance(first, (int, np.integer)):
+        return [int(j) for j in res]
 
     id_map = {id(g): i for i, g in enumerate(geom_list)}
     out = []
@@ -121,44 +323,887 @@ def _strtree_indices(tree: STRtree, query_geom, geom_list):
     return out
 
 
-def compute_scores(submission_raw: pd.DataFrame):
+# ---------------- Convex-decomposition (SAT) collision engine ----------------
+# Every tree is the same polygon, so it is split once into convex pieces
+# (three tiers + trunk). Two trees overlap iff some pair of their pieces
+# overlaps with positive depth on every separating axis. Float rounding cannot
+# decide contacts closer than SAT_EPS, so such pairs are handed to the shapely
+# `intersects and not touches` check on the exact coordinates.
+TREE_PIECES = np.array(
+    [
+        # top tier (triangle, last vertex repeated to pad to 4)
+        [(-0.125, 0.5), (0.125, 0.5), (0.0, 0.8), (0.0, 0.8)],
+        # middle tier
+        [(-0.2, 0.25), (0.2, 0.25), (0.0625, 0.5), (-0.0625, 0.5)],
+        # bottom tier
+        [(-0.35, 0.0), (0.35, 0.0), (0.1, 0.25), (-0.1, 0.25)],
+        # trunk
+        [(-0.075, -0.2), (0.075, -0.2), (0.075, 0.0), (-0.075, 0.0)],
+    ],
+    dtype=np.float64,
+)
+TREE_RADIUS = float(np.hypot(TREE_PIECES[..., 0], TREE_PIECES[..., 1]).max())
+SAT_EPS = 1e-9  # half-width of the undecided band around zero depth
+
+
+def _piece_axes(pieces):
+    """Unit edge normals of (..., 4, 4, 2) pieces; degenerate edges get a zero axis."""
+    edges = np.roll(pieces, -1, axis=-2) - pieces
+    normals = np.stack([edges[..., 1], -edges[..., 0]], axis=-1)
+    length = np.hypot(normals[..., 0], normals[..., 1])[..., None]
+    return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+
+
+TREE_PIECE_AXES = _piece_axes(TREE_PIECES)
+
+
+def _placed_pieces(x, y, deg):
+    """Rotates and translates the template pieces: returns vertices and axes, (N, 4, 4, 2) each."""
+    theta = np.radians(np.asarray(deg, dtype=np.float64))
+    c = np.cos(theta)[:, None, None]
+    s = np.sin(theta)[:, None, None]
+    px, py = TREE_PIECES[..., 0], TREE_PIECES[..., 1]
+    ax, ay = TREE_PIECE_AXES[..., 0], TREE_PIECE_AXES[..., 1]
+    verts = np.stack([c * px - s * py + np.asarray(x)[:, None, None],
+                      s * px + c * py + np.asarray(y)[:, None, None]], axis=-1)
+    axes = np.stack([c * ax - s * ay, s * ax + c * ay], axis=-1)
+    return verts, axes
+
+
+def _candidate_pairs(x, y, reach):
+    """Pairs (i < j) whose centers are closer than `reach`, via sort-and-sweep on x."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    order = np.argsort(x, kind="stable")
+    xs = x[order]
+    hi = np.searchsorted(xs, xs + reach, side="right")
+    counts = hi - np.arange(n) - 1
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty((0, 2), dtype=np.intp)
+
+    a = np.repeat(np.arange(n), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    b = a + 1 + (np.arange(total) - starts)
+    i, j = order[a], order[b]
+    near = (x[i] - x[j]) ** 2 + (y[i] - y[j]) ** 2 < reach * reach
+    pairs = np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1)[near]
+    return pairs
+
+
+def _project_overlap(verts_a, axes, verts_b):
+    """
+    Projection overlap of pieces a and b on the edge normals of a.
+    verts_a / axes / verts_b: (T, 4, 2)  ->  (T, 4 axes)
+    """
+    pa = np.einsum("tvd,tkd->tkv", verts_a, axes)
+    pb = np.einsum("tvd,tkd->tkv", verts_b, axes)
+    overlap = np.minimum(pa.max(axis=-1), pb.max(axis=-1)) - np.maximum(pa.min(axis=-1), pb.min(axis=-1))
+    overlap[~axes.any(axis=-1)] = np.inf  # degenerate edge of the padded triangle
+    return overlap
+
+
+def _boxes_overlap(lo_a, hi_a, lo_b, hi_b):
+    """Axis-aligned boxes overlap or come within SAT_EPS of each other on both axes."""
+    ov = np.minimum(hi_a, hi_b) - np.maximum(lo_a, lo_b)
+    return (ov > -SAT_EPS).all(axis=-1)
+
+
+def _exact_overlaps(pairs, x_str, y_str, deg_str):
+    """Shapely `intersects and not touches` on the given (K, 2) pairs, built from the value strings."""
+    used = np.unique(pairs)
+    polygons = np.empty(len(x_str), dtype=object)
+    polygons[used] = [ChristmasTree(x_str[k], y_str[k], deg_str[k]).polygon for k in used]
+    a, b = polygons[pairs[:, 0]], polygons[pairs[:, 1]]
+    return shapely.intersects(a, b) & ~shapely.touches(a, b)
+
+
+def sat_overlapping_pairs(x, y, deg, x_str=None, y_str=None, deg_str=None, chunk=4096):
+    """
+    Returns the (i, j) index pairs of trees whose interiors overlap, as an (K, 2) array.
+    x / y / deg are unscaled float arrays of one group. Pairs in near contact are
+    decided by shapely on x_str / y_str / deg_str (default: repr of the floats).
+    """
+    verts, axes = _placed_pieces(x, y, deg)
+    piece_lo, piece_hi = verts.min(axis=2), verts.max(axis=2)         # (N, 4, 2)
+    tree_lo, tree_hi = piece_lo.min(axis=1), piece_hi.max(axis=1)     # (N, 2)
+
+    pairs = _candidate_pairs(x, y, 2 * TREE_RADIUS + SAT_EPS)
+    # the x / y axes are separating axes too: prune by tree boxes, then piece boxes
+    pairs = pairs[_boxes_overlap(tree_lo[pairs[:, 0]], tree_hi[pairs[:, 0]],
+                                 tree_lo[pairs[:, 1]], tree_hi[pairs[:, 1]])]
+    hits, undecided = [], []
+    for start in range(0, len(pairs), chunk):
+        block = pairs[start:start + chunk]
+        pi, pj = block[:, 0], block[:, 1]
+        boxes = _boxes_overlap(piece_lo[pi][:, :, None], piece_hi[pi][:, :, None],
+                               piece_lo[pj][:, None, :], piece_hi[pj][:, None, :])  # (M, 4a, 4b)
+        m, pa, pb = np.nonzero(boxes)
+        if len(m) == 0:
+            continue
+        i, j = pi[m], pj[m]
+        ov_a = _project_overlap(verts[i, pa], axes[i, pa], verts[j, pb])
+        ov_b = _project_overlap(verts[j, pb], axes[j, pb], verts[i, pa])
+        depth = np.minimum(ov_a.min(axis=-1), ov_b.min(axis=-1))  # < 0: separated
+        hit = np.unique(m[depth > SAT_EPS])
+        near = np.setdiff1d(m[np.abs(depth) <= SAT_EPS], hit)
+        hits.append(block[hit])
+        undecided.append(block[near])
+
+    undecided = np.concatenate(undecided) if undecided else np.empty((0, 2), dtype=np.intp)
+    if len(undecided):
+        if x_str is None:
+            x_str, y_str, deg_str = ([repr(float(v)) for v in a] for a in (x, y, deg))
+        hits.append(undecided[_exact_overlaps(undecided, x_str, y_str, deg_str)])
+    return np.concatenate(hits) if hits else np.empty((0, 2), dtype=np.intp)
+
+
+def _scaled_bounds(x_str, y_str, deg):
+    """
+    Axis-aligned bounds (scaled) of the placed trees of one group, with the same
+    arithmetic as the ChristmasTree polygons, so the side matches the shapely path.
+    """
+    offsets = np.array(
+        [(float(Decimal(a) * scale_factor), float(Decimal(b) * scale_factor)) for a, b in zip(x_str, y_str)],
+        dtype=np.float64,
+    ).reshape(-1, 2)
+    rings = _rotated_rings(deg) + offsets[:, None, :]
+    lo, hi = rings.min(axis=(0, 1)), rings.max(axis=(0, 1))
+    return float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])
+
+
+def _shapely_overlapping_pairs(polygons):
+    """Reference pair check of the shapely path, as an (K, 2) array with i < j."""
+    r_tree = STRtree(polygons)
+    out = []
+    for i, poly in enumerate(polygons):
+        for j in _strtree_indices(r_tree, poly, polygons):
+            if j > i and poly.intersects(polygons[j]) and not poly.touches(polygons[j]):
+                out.append((i, j))
+    return np.array(out, dtype=np.intp).reshape(-1, 2)
+
+
+NEAR_CONTACT_GAPS = (1e-13, -1e-13, 1e-14, -1e-14, 1e-15, -1e-15)
+
+
+def _near_contact_layouts(rng, count):
+    """
+    Two-tree layouts within NEAR_CONTACT_GAPS of contact (negative: overlapping):
+    rotated side-by-side / stacked neighbours, and a random corner of one tree
+    placed against a random edge of another.
+    """
+    outline = np.asarray(TEMPLATE_POLYGON.exterior.coords, dtype=np.float64)[:-1] / float(scale_factor)
+    orient = np.sign(np.sum(outline[:, 0] * np.roll(outline[:, 1], -1) - np.roll(outline[:, 0], -1) * outline[:, 1]))
+
+    def placed(deg):
+        t = np.radians(deg)
+        return outline @ np.array([[np.cos(t), np.sin(t)], [-np.sin(t), np.cos(t)]])
+
+    layouts = []
+    for gap in NEAR_CONTACT_GAPS:
+        for dx, dy in ((0.7, 0.0), (0.0, 1.0)):
+            # neighbour at (dx, dy) + gap in the frame of the first tree, rotated with it
+            deg = rng.uniform(0.0, 360.0)
+            ox, oy = dx + gap * (dx > 0), dy + gap * (dy > 0)
+            t = np.radians(deg)
+            layouts.append((np.array([0.0, ox * np.cos(t) - oy * np.sin(t)]),
+                            np.array([0.0, ox * np.sin(t) + oy * np.cos(t)]),
+                            np.array([deg, deg])))
+
+    for k in range(count):
+        gap = NEAR_CONTACT_GAPS[k % len(NEAR_CONTACT_GAPS)]
+        deg_a, deg_b = rng.uniform(0.0, 360.0, 2)
+        ring_a = placed(deg_a)
+        e = rng.integers(len(ring_a))
+        p0, p1 = ring_a[e], ring_a[(e + 1) % len(ring_a)]
+        edge = p1 - p0
+        normal = orient * np.array([edge[1], -edge[0]]) / np.hypot(*edge)   # outward
+        ring_b = placed(deg_b)
+        corner = ring_b[np.argmin(ring_b @ normal)]                        # corner of b facing a
+        center = p0 + rng.uniform(0.05, 0.95) * edge + gap * normal - corner
+        layouts.append((np.array([0.0, center[0]]), np.array([0.0, center[1]]), np.array([deg_a, deg_b])))
+    return layouts
+
+
+def verify_sat_engine(trials: int = 200, trees: int = 30, seed: int = 0):
+    """
+    Compares the SAT engine with the shapely predicates on random crowded groups,
+    exact-contact layouts and near-contact layouts (see _near_contact_layouts).
+    Returns dict with pairs / mismatches.
+    """
+    rng = np.random.default_rng(seed)
+    layouts = [
+        # exact contacts that must count as touching
+        (np.array([0.0, 0.7]), np.array([0.0, 0.0]), np.array([0.0, 0.0])),
+        (np.array([0.0, 0.0]), np.array([0.0, 1.0]), np.array([0.0, 0.0])),
+        (np.array([0.0, 0.15]), np.array([0.0, 0.0]), np.array([0.0, 180.0])),
+    ]
+    layouts += _near_contact_layouts(rng, 5 * trials)
+    for _ in range(trials):
+        box = rng.uniform(1.0, 6.0)
+        layouts.append((
+            rng.uniform(-box, box, trees),
+            rng.uniform(-box, box, trees),
+            rng.uniform(0.0, 360.0, trees),
+        ))
+
+    checked = 0
+    mismatches = []
+    for k, (x, y, deg) in enumerate(layouts):
+        polygons = [
+            ChristmasTree(repr(float(a)), repr(float(b)), repr(float(d))).polygon
+            for a, b, d in zip(x, y, deg)
+        ]
+        ref = {tuple(p) for p in _shapely_overlapping_pairs(polygons).tolist()}
+        got = {tuple(p) for p in sat_overlapping_pairs(x, y, deg).tolist()}
+        checked += len(x) * (len(x) - 1) // 2
+        if ref != got:
+            mismatches.append((k, sorted(ref ^ got)))
+    return {"layouts": len(layouts), "pairs": checked, "mismatches": mismatches}
+
+
+SCORING_ENGINES = ("shapely", "sat")
+
+
+def _group_side_shapely(group, x_str, y_str, deg_str):
+    """Collision check + bounding side (Decimal, scaled) with shapely predicates."""
+    placed_trees = [ChristmasTree(x, y, d) for x, y, d in zip(x_str, y_str, deg_str)]
+    all_polygons = [t.polygon for t in placed_trees]
+    r_tree = STRtree(all_polygons)
+
+    # collision check
+    for i, poly in enumerate(all_polygons):
+        indices = _strtree_indices(r_tree, poly, all_polygons)
+        for j in indices:
+            if j == i:
+                continue
+            if poly.intersects(all_polygons[j]) and not poly.touches(all_polygons[j]):
+                raise ParticipantVisibleError(f"组 {group} 存在树重叠（overlap）。")
+
+    bounds = unary_union(all_polygons).bounds
+    return Decimal(max(bounds[2] - bounds[0], bounds[3] - bounds[1]))
+
+
+def _group_side_sat(group, x_str, y_str, deg_str):
+    """Collision check + bounding side (Decimal, scaled) with the SAT engine."""
+    def to_float(v):
+        return np.fromiter(map(float, v), dtype=np.float64, count=len(v))
+
+    x, y, deg = to_float(x_str), to_float(y_str), to_float(deg_str)
+    if len(sat_overlapping_pairs(x, y, deg, x_str, y_str, deg_str)):
+        raise ParticipantVisibleError(f"组 {group} 存在树重叠（overlap）。")
+
+    minx, miny, maxx, maxy = _scaled_bounds(x_str, y_str, deg)
+    return Decimal(max(maxx - minx, maxy - miny))
+
+
+def score_group(group, x_str, y_str, deg_str, engine: str = "shapely"):
+    """
+    Collision check + score of one validated group (prefix-stripped value strings).
+
+    Returns:
+      group_score: Decimal
+      side: float  (unscaled side length)
+    """
+    if engine == "sat":
+        side_length_scaled = _group_side_sat(group, x_str, y_str, deg_str)
+    else:
+        side_length_scaled = _group_side_shapely(group, x_str, y_str, deg_str)
+    group_score = (side_length_scaled ** 2) / (scale_factor ** 2) / Decimal(len(x_str))
+    return group_score, float(side_length_scaled / scale_factor)
+
+
+def compute_scores(submission_raw: pd.DataFrame, engine: str = "shapely"):
     """
     Returns:
       total_score: float
       group_scores: dict[group -> float]
       group_side_length: dict[group -> float]  (unscaled side length)
+
+    engine: "shapely" (GEOS predicates, reference) or "sat" (NumPy convex decomposition)
     """
-    submission = _strip_s_prefix_and_validate(submission_raw)
+    if engine not in SCORING_ENGINES:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {SCORING_ENGINES}")
+    parsed = parse_submission(submission_raw)
 
     total_score = Decimal("0.0")
     group_scores = {}
     group_side = {}
 
-    for group, df_group in submission.groupby("tree_count_group"):
-        num_trees = len(df_group)
+    for group, idx in parsed.group_slices().items():
+        group_score, side = score_group(
+            group, parsed.x_str[idx], parsed.y_str[idx], parsed.deg_str[idx], engine=engine
+        )
+        group_scores[group] = float(group_score)
+        group_side[group] = side
+        total_score += group_score
 
-        placed_trees = [ChristmasTree(r["x"], r["y"], r["deg"]) for _, r in df_group.iterrows()]
-        all_polygons = [t.polygon for t in placed_trees]
-        r_tree = STRtree(all_polygons)
+    return float(total_score), group_scores, group_side
 
-        # collision check
-        for i, poly in enumerate(all_polygons):
-            indices = _strtree_indices(r_tree, poly, all_polygons)
-            for j in indices:
-                if j == i:
-                    continue
-                if poly.intersects(all_polygons[j]) and not poly.touches(all_polygons[j]):
-                    raise ParticipantVisibleError(f"组 {group} 存在树重叠（overlap）。")
 
-        bounds = unary_union(all_polygons).bounds
-        side_length_scaled = max(bounds[2] - bounds[0], bounds[3] - bounds[1])
-        group_score = (Decimal(side_length_scaled) ** 2) / (scale_factor ** 2) / Decimal(num_trees)
+# ---------------- Clearance analysis ----------------
+def _bulk_polygons(x, y, deg):
+    """Scaled tree polygons of one group, rotated in one vectorized pass (no per-tree Decimal work)."""
+    rings = _rotated_rings(deg)
+    offsets = np.stack([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)], axis=1)
+    return shapely.polygons(rings + offsets[:, None, :] * float(scale_factor))
 
-        group_scores[group] = float(group_score)
-        group_side[group] = float(Decimal(side_length_scaled) / scale_factor)
-        total_score += group_score
 
-    return float(total_score), group_scores, group_side
+def group_clearance(polygons, square=None):
+    """
+    Per-tree slack of one group, from bulk STRtree queries (no pairwise loops).
+
+    polygons: scaled tree polygons
+    square:   (minx, miny, side) of the bounding square (scaled); computed if omitted
+
+    Returns dict of unscaled float arrays, one value per tree:
+      gap:      distance to the nearest other tree (inf for a single tree)
+      neighbor: index of that tree (-1 for a single tree)
+      edge:     distance to the nearest side of the bounding square
+    """
+    polygons = np.asarray(polygons, dtype=object)
+    n = len(polygons)
+    tree_bounds = shapely.bounds(polygons)
+    if square is None:
+        minx, miny = tree_bounds[:, 0].min(), tree_bounds[:, 1].min()
+        side = max(tree_bounds[:, 2].max() - minx, tree_bounds[:, 3].max() - miny)
+    else:
+        minx, miny, side = square
+
+    gap = np.full(n, np.inf)
+    neighbor = np.full(n, -1, dtype=np.intp)
+    if n > 1:
+        # Two bulk passes, no widening loop. The tree with the nearest centroid
+        # (a cheap point query) gives each tree an upper bound on its gap; any
+        # closer tree has its envelope within that bound, so one envelope query
+        # grown per tree by it plus vectorized exact distances finds the true
+        # nearest. Much cheaper than STRtree.query_nearest / "dwithin" on polygons.
+        centers = shapely.centroid(polygons)
+        (src, dst) = STRtree(centers).query_nearest(centers, exclusive=True, all_matches=False)
+        gap[src] = shapely.distance(polygons[src], polygons[dst])
+        neighbor[src] = dst
+
+        reach = gap * (1 + 1e-9) + 1.0  # rounding slack (scaled units)
+        b = tree_bounds
+        boxes = shapely.box(b[:, 0] - reach, b[:, 1] - reach, b[:, 2] + reach, b[:, 3] + reach)
+        src, dst = STRtree(polygons).query(boxes)
+        keep = (src != dst) & (dst != neighbor[src])
+        # each unordered pair is measured once and used in both directions
+        pair = np.unique(np.minimum(src[keep], dst[keep]) * n + np.maximum(src[keep], dst[keep]))
+        lo, hi = pair // n, pair % n
+        dist = shapely.distance(polygons[lo], polygons[hi])
+        src, dst, dist = np.concatenate([lo, hi]), np.concatenate([hi, lo]), np.concatenate([dist, dist])
+
+        order = np.lexsort((dist, src))
+        src, dst, dist = src[order], dst[order], dist[order]
+        first = np.ones(len(src), dtype=bool)
+        first[1:] = src[1:] != src[:-1]
+        src, dst, dist = src[first], dst[first], dist[first]
+        closer = (dist < gap[src]) | ((dist == gap[src]) & (dst < neighbor[src]))  # ties: lowest index
+        gap[src[closer]] = dist[closer]
+        neighbor[src[closer]] = dst[closer]
+        gap /= float(scale_factor)
+
+    edge = np.minimum.reduce([
+        tree_bounds[:, 0] - minx,
+        minx + side - tree_bounds[:, 2],
+        tree_bounds[:, 1] - miny,
+        miny + side - tree_bounds[:, 3],
+    ]) / float(scale_factor)
+    return {"gap": gap, "neighbor": neighbor, "edge": np.maximum(edge, 0.0)}
+
+
+def compute_clearance(submission_raw: pd.DataFrame):
+    """
+    Clearance of every tree in every group.
+
+    Returns:
+      dict[group -> dict]  (see group_clearance), arrays in file row order of the group
+    """
+    parsed = parse_submission(submission_raw)
+    out = {}
+    for group, idx in parsed.group_slices().items():
+        polygons = _bulk_polygons(parsed.x[idx], parsed.y[idx], parsed.deg[idx])
+        out[group] = group_clearance(polygons)
+    return out
+
+
+def clearance_summary(clearance):
+    """Per-group columns for reports: min/mean gap to neighbours and min distance to the square edge."""
+    rows = {}
+    for group, c in clearance.items():
+        gap = c["gap"][np.isfinite(c["gap"])]
+        rows[group] = {
+            "min_gap": float(gap.min()) if len(gap) else float("nan"),
+            "mean_gap": float(gap.mean()) if len(gap) else float("nan"),
+            "max_gap": float(gap.max()) if len(gap) else float("nan"),
+            "min_edge": float(c["edge"].min()),
+        }
+    return rows
+
+
+# ---------------- Rotation analysis (rotating calipers) ----------------
+def _min_square_rotation(hull):
+    """
+    Rotating calipers on one convex hull (H, 2): the rotation theta in [0, pi/2)
+    whose bounding square is smallest. Returns (side at theta = 0, best side, theta).
+
+    Between consecutive caliper breakpoints (edge directions mod pi/2) the width
+    and height are fixed sinusoids, concave where positive, so the minimum of
+    max(width, height) is at a breakpoint or where width == height.
+    """
+    def side_at(theta):
+        u = np.stack([np.cos(theta), np.sin(theta)])          # (2, K)
+        v = np.stack([-np.sin(theta), np.cos(theta)])
+        pu, pv = hull @ u, hull @ v                            # (H, K)
+        return np.maximum(pu.max(axis=0) - pu.min(axis=0), pv.max(axis=0) - pv.min(axis=0))
+
+    edges = np.roll(hull, -1, axis=0) - hull
+    phi = np.mod(np.arctan2(edges[:, 1], edges[:, 0]), np.pi / 2)
+    breaks = np.unique(np.concatenate([[0.0, np.pi / 2], phi]))
+
+    # antipodal pairs inside each interval, from its midpoint
+    mid = (breaks[:-1] + breaks[1:]) / 2
+    u = np.stack([np.cos(mid), np.sin(mid)])
+    v = np.stack([-np.sin(mid), np.cos(mid)])
+    pu, pv = hull @ u, hull @ v
+    dw = hull[pu.argmax(axis=0)] - hull[pu.argmin(axis=0)]    # width(t)  = dw . u(t)
+    dh = hull[pv.argmax(axis=0)] - hull[pv.argmin(axis=0)]    # height(t) = dh . v(t)
+
+    # width == height  <=>  a cos t + b sin t = 0
+    a = dw[:, 0] - dh[:, 1]
+    b = dw[:, 1] + dh[:, 0]
+    cross = np.mod(np.arctan2(-a, b), np.pi)
+    valid = (cross >= breaks[:-1]) & (cross <= breaks[1:])
+
+    candidates = np.concatenate([breaks[:-1], cross[valid]])
+    sides = side_at(candidates)
+    k = int(sides.argmin())
+    return float(side_at(np.array([0.0]))[0]), float(sides[k]), float(candidates[k])
+
+
+def rotation_analysis(submission_raw: pd.DataFrame):
+    """
+    Potential gain from rotating each whole group, in one pass over all groups.
+
+    All tree rings are rotated in one vectorized pass (_rotated_rings); the convex
+    hulls of all groups are computed by one vectorized shapely call.
+
+    Returns:
+      dict[group -> dict(side, best_side, angle_deg, gain)]
+        side:      current axis-aligned side
+        best_side: side after rotating the group by -angle_deg
+        gain:      score reduction (side^2 - best_side^2) / N
+    """
+    parsed = parse_submission(submission_raw)
+    slices = parsed.group_slices()
+    groups = list(slices.keys())
+    if not groups:
+        return {}
+
+    order = np.concatenate([slices[g] for g in groups])
+    counts = np.array([len(slices[g]) for g in groups])
+    rings = _rotated_rings(parsed.deg[order])[:, :-1] / float(scale_factor)
+    rings += np.stack([parsed.x[order], parsed.y[order]], axis=1)[:, None, :]
+
+    group_index = np.repeat(np.arange(len(groups)), counts * rings.shape[1])
+    # one linestring per group through all its tree vertices: same hull as a
+    # multipoint, without creating a Point object per vertex
+    hulls = shapely.convex_hull(shapely.linestrings(rings.reshape(-1, 2), indices=group_index))
+    coords, owner = shapely.get_coordinates(hulls, return_index=True)
+    starts = np.searchsorted(owner, np.arange(len(groups) + 1))
+
+    out = {}
+    for k, g in enumerate(groups):
+        hull = coords[starts[k]:starts[k + 1]]
+        if len(hull) > 1 and (hull[0] == hull[-1]).all():
+            hull = hull[:-1]
+        side, best_side, theta = _min_square_rotation(hull)
+        n = int(counts[k])
+        out[g] = {
+            "side": side,
+            "best_side": best_side,
+            "angle_deg": float(np.degrees(theta)),
+            "gain": (side * side - best_side * best_side) / n,
+        }
+    return out
+
+
+def rotate_submission(submission_raw: pd.DataFrame, analysis=None, min_gain=0.0):
+    """
+    Writes each group rotated by its best angle (re-centred on the origin) where
+    that gains more than `min_gain`. Rotated groups are re-checked with the shapely
+    predicates; a group that fails (float round-off at touching contacts) is kept as is.
+
+    Returns:
+      (DataFrame with id/x/y/deg in the 's' format, dict[group -> applied angle_deg])
+    """
+    parsed = parse_submission(submission_raw)
+    if analysis is None:
+        analysis = rotation_analysis(submission_raw)
+
+    ids = parsed.ids.tolist()
+    xs = ["s" + v for v in parsed.x_str.tolist()]
+    ys = ["s" + v for v in parsed.y_str.tolist()]
+    degs = ["s" + v for v in parsed.deg_str.tolist()]
+    applied = {}
+
+    for g, idx in parsed.group_slices().items():
+        res = analysis.get(g)
+        if res is None or res["gain"] <= min_gain:
+            continue
+        t = np.radians(res["angle_deg"])
+        c, s = np.cos(t), np.sin(t)
+        x, y = parsed.x[idx], parsed.y[idx]
+        # rotate by -t: the caliper directions u(t), v(t) become the x / y axes
+        nx = c * x + s * y
+        ny = -s * x + c * y
+        nd = np.mod(parsed.deg[idx] - res["angle_deg"], 360.0)
+
+        verts = _rotated_rings(nd)[:, :-1] / float(scale_factor)
+        verts += np.stack([nx, ny], axis=1)[:, None, :]
+        lo, hi = verts.min(axis=(0, 1)), verts.max(axis=(0, 1))
+        nx -= (lo[0] + hi[0]) / 2
+        ny -= (lo[1] + hi[1]) / 2
+
+        x_str = [repr(float(v)) for v in nx]
+        y_str = [repr(float(v)) for v in ny]
+        d_str = [repr(float(v)) for v in nd]
+        try:
+            score_group(g, x_str, y_str, d_str, engine="shapely")
+        except ParticipantVisibleError:
+            continue
+
+        for p, xv, yv, dv in zip(idx, x_str, y_str, d_str):
+            xs[p], ys[p], degs[p] = "s" + xv, "s" + yv, "s" + dv
+        applied[g] = res["angle_deg"]
+
+    out = pd.DataFrame({"id": ids, "x": xs, "y": ys, "deg": degs})
+    return out, applied
+
+
+# ---------------- Rendering (shared by GUI and headless export) ----------------
+PALETTE = {
+    "bg": "#FFF4FB",
+    "card": "#FFFFFF",
+    "shadow": "#FFD6EA",
+    "accent": "#FF3D9A",      # pink
+    "accent2": "#4D96FF",     # blue
+    "accent3": "#2EC4B6",     # teal
+    "warn": "#FFB703",
+    "text": "#1F1F2E",
+    "muted": "#6B6B7A",
+    "plot_bg": "#FFF9FE",
+    "hl": "#FF006E",
+}
+TREE_COLORS = [
+    "#FF3D9A", "#4D96FF", "#2EC4B6", "#FFB703",
+    "#9B5DE5", "#F15BB5", "#00BBF9", "#00F5D4"
+]
+
+
+def _group_geometry(df_group: pd.DataFrame):
+    """
+    Builds the (scaled) tree polygons of one validated group.
+
+    Returns:
+      polys_scaled: list[Polygon]
+      bounds: (minx, miny, maxx, maxy)  (scaled)
+      side_scaled: float  (side of the axis-aligned bounding square, scaled)
+    """
+    trees = [ChristmasTree(r["x"], r["y"], r["deg"]) for _, r in df_group.iterrows()]
+    polys_scaled = [t.polygon for t in trees]
+    bounds = unary_union(polys_scaled).bounds
+    minx, miny, maxx, maxy = bounds
+    side_scaled = max(maxx - minx, maxy - miny)
+    return polys_scaled, bounds, side_scaled
+
+
+def draw_packing(ax, polys_scaled, bounds, side_scaled, title, face_colors=None):
+    """
+    Draws one group (trees + bounding square) on a matplotlib Axes.
+    `face_colors` overrides the palette per tree (e.g. a clearance heatmap).
+    Returns the list of tree patches, in row order.
+    """
+    minx, miny, _, _ = bounds
+
+    ax.clear()
+    ax.set_title(title, fontsize=12, fontweight="bold")
+    ax.set_aspect("equal", adjustable="box")
+    ax.set_facecolor(PALETTE["plot_bg"])
+    ax.grid(True, alpha=0.35)
+
+    # draw trees
+    patches = []
+    for i, poly in enumerate(polys_scaled, start=1):
+        x, y = poly.exterior.xy
+        x = [v / float(scale_factor) for v in x]
+        y = [v / float(scale_factor) for v in y]
+
+        if face_colors is not None:
+            color = face_colors[i - 1]
+        else:
+            color = TREE_COLORS[(i - 1) % len(TREE_COLORS)]
+        patch = MplPolygon(list(zip(x, y)), closed=True)
+        patch.set_facecolor(color)
+        patch.set_edgecolor("#FFFFFF")
+        patch.set_alpha(0.48)
+        patch.set_linewidth(1.6)
+        patch.set_zorder(3)
+        patch.set_path_effects([
+            pe.SimplePatchShadow(offset=(2, -2), alpha=0.25),
+            pe.Normal()
+        ])
+        ax.add_patch(patch)
+        patches.append(patch)
+
+    # Bounding square
+    side = side_scaled
+    sq = Polygon(
+        [(minx, miny), (minx + side, miny), (minx + side, miny + side), (minx, miny + side)]
+    )
+    sx, sy = sq.exterior.xy
+    sx = [v / float(scale_factor) for v in sx]
+    sy = [v / float(scale_factor) for v in sy]
+    ax.plot(sx, sy, linewidth=2.6, color=PALETTE["accent2"], zorder=2)
+
+    # View limits with padding
+    pad = float(Decimal(side) / scale_factor) * 0.08 + 0.05
+    minx_f = float(Decimal(minx) / scale_factor) - pad
+    miny_f = float(Decimal(miny) / scale_factor) - pad
+    side_f = float(Decimal(side) / scale_factor) + 2 * pad
+    ax.set_xlim(minx_f, minx_f + side_f)
+    ax.set_ylim(miny_f, miny_f + side_f)
+    return patches
+
+
+def clearance_colors(gap, cmap_name="RdYlGn"):
+    """
+    Heatmap colours for per-tree gaps: red = touching, green = most slack in the group.
+    Returns (rgba array, vmax).
+    """
+    finite = gap[np.isfinite(gap)]
+    vmax = float(finite.max()) if len(finite) and finite.max() > 0 else 1.0
+    values = np.clip(np.where(np.isfinite(gap), gap, vmax) / vmax, 0.0, 1.0)
+    return matplotlib.colormaps[cmap_name](values), vmax
+
+
+# ---------------- Headless export ----------------
+EXPORT_FORMATS = ("png", "svg")
+
+
+def _parse_group_range(spec: str):
+    """
+    Parses a group selection like "1-50", "2,5,10-12" into sorted group ids ("001", ...).
+    """
+    def number(text, part):
+        text = text.strip()
+        if not text.isdigit() or int(text) < 1:
+            raise ValueError(f"invalid group selection {part!r} in {spec!r} (group numbers are integers >= 1)")
+        return int(text)
+
+    out = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            lo, hi = number(lo, part), number(hi, part)
+            if lo > hi:
+                lo, hi = hi, lo
+            out.update(range(lo, hi + 1))
+        else:
+            out.add(number(part, part))
+    if not out:
+        raise ValueError(f"empty group selection: {spec!r}")
+    return [f"{n:03d}" for n in sorted(out)]
+
+
+def _export_group(args):
+    """
+    Process-pool worker: renders one group to an image file with the Agg/SVG backend.
+    `rows` holds the validated (prefix-stripped) x/y/deg strings of the group.
+    """
+    group, rows, out_path, fmt, dpi = args
+    df_group = pd.DataFrame(rows, columns=["x", "y", "deg"])
+    polys_scaled, bounds, side_scaled = _group_geometry(df_group)
+
+    n = len(df_group)
+    side = float(Decimal(side_scaled) / scale_factor)
+    group_score = float((Decimal(side_scaled) ** 2) / (scale_factor ** 2) / Decimal(n))
+
+    fig = Figure(figsize=(7.2, 6.0), dpi=dpi, facecolor=PALETTE["plot_bg"])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    title = f"N={int(group)} (group {group}) Packing" if group.isdigit() else f"group {group} Packing"
+    draw_packing(ax, polys_scaled, bounds, side_scaled, title)
+    ax.annotate(
+        f"score: {group_score:.12f}\nside: {side:.6f}",
+        xy=(0.02, 0.98),
+        xycoords="axes fraction",
+        va="top",
+        bbox=dict(boxstyle="round,pad=0.35", fc="white", ec=PALETTE["accent"], alpha=0.96),
+        zorder=20,
+    )
+    fig.savefig(out_path, format=fmt, facecolor=fig.get_facecolor())
+    return group, out_path
+
+
+def export_groups(submission_raw: pd.DataFrame, out_dir: str, fmt: str = "png",
+                  groups=None, workers=None, dpi: int = 100):
+    """
+    Renders every group (or the selected `groups`) of a submission to PNG/SVG files,
+    one file per group, across a process pool.
+
+    Returns:
+      stats: dict with keys exported / seconds / groups_per_sec / files
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported format {fmt!r}, expected one of {EXPORT_FORMATS}")
+
+    parsed = parse_submission(submission_raw)
+    by_group = parsed.group_slices()
+    if groups is None:
+        groups = sorted(by_group.keys())
+    missing = [g for g in groups if g not in by_group]
+    if missing:
+        raise ParticipantVisibleError(f"CSV 里找不到这些 group：{missing[:10]}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [
+        (
+            g,
+            list(zip(
+                parsed.x_str[by_group[g]].tolist(),
+                parsed.y_str[by_group[g]].tolist(),
+                parsed.deg_str[by_group[g]].tolist(),
+            )),
+            os.path.join(out_dir, f"group_{g}.{fmt}"),
+            fmt,
+            dpi,
+        )
+        for g in groups
+    ]
+
+    t0 = time.perf_counter()
+    files = []
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            files.append(_export_group(job)[1])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for _, path in pool.map(_export_group, jobs, chunksize=max(1, len(jobs) // 64)):
+                files.append(path)
+    seconds = time.perf_counter() - t0
+
+    return {
+        "exported": len(files),
+        "seconds": seconds,
+        "groups_per_sec": len(files) / seconds if seconds > 0 else float("inf"),
+        "files": files,
+    }
+
+
+# ---------------- Snapshot timeline ----------------
+def _natural_key(path):
+    """Sort key so that snap_2.csv comes before snap_10.csv."""
+    name = os.path.basename(path)
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", name)]
+
+
+def snapshot_paths(directory):
+    """Snapshot CSVs of a directory in natural name order."""
+    return sorted(glob.glob(os.path.join(directory, "*.csv")), key=_natural_key)
+
+
+def _load_snapshot(path):
+    """
+    Parses one snapshot and keeps only what playback needs: ids, float x / y / deg
+    and the per-group positions (sorted by id). The value strings are dropped.
+    """
+    parsed = parse_submission(pd.read_csv(path))
+    slices = {
+        g: idx[np.argsort(parsed.ids[idx], kind="stable")]
+        for g, idx in parsed.group_slices().items()
+    }
+    return {"ids": parsed.ids, "x": parsed.x, "y": parsed.y, "deg": parsed.deg, "groups": slices}
+
+
+class SnapshotTimeline:
+    """
+    A directory of submission snapshots, parsed once (in parallel).
+    Per-group vertex arrays are built on first use and kept for the session.
+    """
+
+    def __init__(self, paths, workers=None):
+        self.paths = list(paths)
+        if not self.paths:
+            raise ParticipantVisibleError("没有找到快照 CSV。")
+        workers = workers or min(len(self.paths), os.cpu_count() or 1)
+        if workers == 1:
+            self._snapshots = [_load_snapshot(p) for p in self.paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunk = max(1, len(self.paths) // (4 * workers))
+                self._snapshots = list(pool.map(_load_snapshot, self.paths, chunksize=chunk))
+        self._frames = {}
+
+    @classmethod
+    def from_directory(cls, directory):
+        return cls(snapshot_paths(directory))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def group_frames(self, group):
+        """
+        Returns dict for one group, one entry per snapshot that contains it:
+          snapshots: list[int]           snapshot indices
+          verts:     (F, N, 16, 2) float unscaled closed rings, trees ordered by id
+          bounds:    (F, 4)  minx, miny, maxx, maxy
+          side:      (F,)    bounding-square side
+          score:     (F,)    side^2 / N
+        """
+        if group in self._frames:
+            return self._frames[group]
+
+        ref_ids = None
+        snapshots, verts = [], []
+        inv_scale = 1.0 / float(scale_factor)
+        for k, snap in enumerate(self._snapshots):
+            idx = snap["groups"].get(group)
+            if idx is None:
+                continue
+            ids = snap["ids"][idx]
+            if ref_ids is None:
+                ref_ids = ids
+            elif len(ids) != len(ref_ids) or (ids != ref_ids).any():
+                name = os.path.basename(self.paths[k])
+                raise ParticipantVisibleError(f"快照 {name} 中组 {group} 的 id 与之前的快照不一致。")
+
+            rings = _rotated_rings(snap["deg"][idx]) * inv_scale
+            rings += np.stack([snap["x"][idx], snap["y"][idx]], axis=1)[:, None, :]
+            snapshots.append(k)
+            verts.append(rings)
+
+        if not snapshots:
+            raise ParticipantVisibleError(f"所有快照里都找不到 group='{group}'。")
+
+        verts = np.stack(verts)
+        lo = verts.min(axis=(1, 2))
+        hi = verts.max(axis=(1, 2))
+        side = np.maximum(hi[:, 0] - lo[:, 0], hi[:, 1] - lo[:, 1])
+        frames = {
+            "snapshots": snapshots,
+            "verts": verts,
+            "bounds": np.concatenate([lo, hi], axis=1),
+            "side": side,
+            "score": side ** 2 / verts.shape[1],
+        }
+        self._frames[group] = frames
+        return frames
 
 
 # ---------------- GUI ----------------
@@ -167,23 +1212,8 @@ class TreePackingGUI(tk.Tk):
         super().__init__()
 
         # ---------- colorful palette ----------
-        self.C = {
-            "bg": "#FFF4FB",
-            "card": "#FFFFFF",
-            "shadow": "#FFD6EA",
-            "accent": "#FF3D9A",      # pink
-            "accent2": "#4D96FF",     # blue
-            "accent3": "#2EC4B6",     # teal
-            "warn": "#FFB703",
-            "text": "#1F1F2E",
-            "muted": "#6B6B7A",
-            "plot_bg": "#FFF9FE",
-            "hl": "#FF006E",
-        }
-        self.TREE_COLORS = [
-            "#FF3D9A", "#4D96FF", "#2EC4B6", "#FFB703",
-            "#9B5DE5", "#F15BB5", "#00BBF9", "#00F5D4"
-        ]
+        self.C = dict(PALETTE)
+        self.TREE_COLORS = list(TREE_COLORS)
 
         self.lang = "zh"
         self.T = self._build_i18n()
@@ -198,12 +1228,31 @@ class TreePackingGUI(tk.Tk):
         self.total_score = None
         self.group_scores = None
         self.group_side = None
+        self.group_gain = None
 
         # state
         self._syncing_n = False
         self._hover_items = []
         self._last_hover_item = None
 
+        # group table (virtualized): rows are precomputed once per load,
+        # the Treeview only holds a small pool of items for the visible window
+        self._group_rows = []         # every group, in load order
+        self._sorted_rows = {}        # sort column -> rows sorted ascending (lazy)
+        self._sort_col = "group"
+        self._sort_reverse = False
+        self._view_rows = []          # sorted + filtered rows currently scrollable
+        self._view_filter = None
+        self._table_offset = 0
+        self._table_visible = 18
+        self._table_pool = []
+        self._table_selected = None   # selected group id, kept across repaints of the pool
+        self._filter_after_id = None
+
+        # snapshot playback: parsed snapshots are kept for the session
+        self._timeline = None
+        self._timeline_dir = None
+
         self._build_style()
         self._build_ui()
 
@@ -235,11 +1284,22 @@ class TreePackingGUI(tk.Tk):
                 "col_n": "N",
                 "score": "score",
                 "side": "边长",
+                "gain": "旋转收益",
                 "filter": "🔎 过滤 group：",
                 "clear": "清空",
                 "showing": "显示 {shown}/{total} 个组",
                 "hover_title": "悬停信息（CSV 原始行）",
                 "hover_ph": "把鼠标移到树上查看 CSV 行数据（右侧可滚动）",
+                "heatmap": "🌡️ 间隙热力图（红=贴合，绿=有余量）",
+                "gap": "到最近邻树的距离",
+                "playback": "🎞️ 快照回放",
+                "playback_title": "快照回放 - group {group}",
+                "playback_fail": "回放失败",
+                "play": "▶ 播放",
+                "pause": "⏸ 暂停",
+                "frame": "帧 {k}/{total}",
+                "fps": "{fps:.0f} fps",
+                "edge": "到外框边的距离",
             },
             "en": {
                 "title": "Santa 2025 - Tree Packing Visualizer (Colorful)",
@@ -266,11 +1326,22 @@ class TreePackingGUI(tk.Tk):
                 "col_n": "N",
                 "score": "score",
                 "side": "side",
+                "gain": "rot. gain",
                 "filter": "🔎 Filter group: ",
                 "clear": "Clear",
                 "showing": "Showing {shown}/{total} groups",
                 "hover_title": "Hover (raw CSV row)",
                 "hover_ph": "Hover a tree to see CSV row data (scroll on the right)",
+                "heatmap": "🌡️ Clearance heatmap (red = tight, green = slack)",
+                "gap": "gap to nearest tree",
+                "playback": "🎞️ Playback",
+                "playback_title": "Snapshot playback - group {group}",
+                "playback_fail": "Playback failed",
+                "play": "▶ Play",
+                "pause": "⏸ Pause",
+                "frame": "frame {k}/{total}",
+                "fps": "{fps:.0f} fps",
+                "edge": "gap to square edge",
             },
         }[self.lang]
 
@@ -405,6 +1476,14 @@ class TreePackingGUI(tk.Tk):
         )
         self.btn_load.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
+        self.btn_playback = tk.Button(
+            btn_row, text=self._tr("playback"),
+            bg=self.C["accent3"], fg="white", activebackground="#24B7AA",
+            relief="flat", padx=12, pady=10, font=("Segoe UI", 10, "bold"),
+            command=self.on_playback
+        )
+        self.btn_playback.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(8, 0))
+
         # Language toggle
         lang_row = tk.Frame(right, bg=self.C["card"])
         lang_row.pack(fill=tk.X, pady=(8, 0))
@@ -450,7 +1529,16 @@ class TreePackingGUI(tk.Tk):
             relief="flat", padx=12, pady=10, font=("Segoe UI", 10, "bold"),
             command=self.on_render
         )
-        self.btn_render.pack(fill=tk.X, pady=(10, 10))
+        self.btn_render.pack(fill=tk.X, pady=(10, 6))
+
+        self.heat_var = tk.BooleanVar(value=False)
+        self.chk_heat = tk.Checkbutton(
+            right, text=self._tr("heatmap"), variable=self.heat_var,
+            bg=self.C["card"], fg=self.C["text"], selectcolor=self.C["shadow"],
+            activebackground=self.C["card"], anchor="w",
+            command=lambda: self.on_render() if self.df_raw is not None else None
+        )
+        self.chk_heat.pack(fill=tk.X, pady=(0, 10))
 
         # ---- Hover panel (FIXED HEIGHT, NO RESIZE / NO MOUSE JUMP) ----
         self.lbl_hover_title = tk.Label(
@@ -495,7 +1583,7 @@ class TreePackingGUI(tk.Tk):
         self.filter_var = tk.StringVar(value="")
         self.filter_entry = tk.Entry(filt_row, textvariable=self.filter_var, relief="flat", bg="#FFFFFF", fg=self.C["text"])
         self.filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(8, 8), ipady=6)
-        self.filter_entry.bind("<KeyRelease>", lambda e: self.refresh_group_table())
+        self.filter_entry.bind("<KeyRelease>", lambda e: self._schedule_filter())
 
         self.btn_clear = tk.Button(
             filt_row, text=self._tr("clear"),
@@ -515,26 +1603,39 @@ class TreePackingGUI(tk.Tk):
         table_wrap = ttk.Frame(right, style="Card.TFrame")
         table_wrap.pack(fill=tk.BOTH, expand=True)
 
-        cols = ("group", "n", "score", "side")
-        self.treeview = ttk.Treeview(table_wrap, columns=cols, show="headings", height=18)
-
-        self.treeview.heading("group", text=self._tr("group"))
-        self.treeview.heading("n", text=self._tr("col_n"))
-        self.treeview.heading("score", text=self._tr("score"))
-        self.treeview.heading("side", text=self._tr("side"))
+        cols = ("group", "n", "score", "side", "gain")
+        self.treeview = ttk.Treeview(table_wrap, columns=cols, show="headings", height=self._table_visible)
+        self._update_table_headings()
 
         self.treeview.column("group", width=70, anchor="center")
         self.treeview.column("n", width=55, anchor="center")
         self.treeview.column("score", width=140, anchor="e")
         self.treeview.column("side", width=80, anchor="e")
+        self.treeview.column("gain", width=90, anchor="e")
 
-        sb = ttk.Scrollbar(table_wrap, orient=tk.VERTICAL, command=self.treeview.yview)
-        self.treeview.configure(yscrollcommand=sb.set)
+        self.treeview.tag_configure("even", background="#FFF1FA")
+        self.treeview.tag_configure("odd", background="#EAF4FF")
+
+        # the scrollbar drives our own row offset, not the Treeview
+        self.table_sb = ttk.Scrollbar(table_wrap, orient=tk.VERTICAL, command=self._on_table_scroll)
+        self.table_sb.set(0.0, 1.0)
 
         self.treeview.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        sb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.table_sb.pack(side=tk.RIGHT, fill=tk.Y)
 
         self.treeview.bind("<Double-1>", self._on_table_double_click)
+        self.treeview.bind("<Configure>", self._on_table_configure)
+        self.treeview.bind("<MouseWheel>", self._on_table_wheel)
+        self.treeview.bind("<Button-4>", lambda e: self._scroll_table_by(-3))
+        self.treeview.bind("<Button-5>", lambda e: self._scroll_table_by(3))
+        self.treeview.bind("<<TreeviewSelect>>", self._on_table_select)
+        # the Treeview only holds the visible window, so navigation keys are ours too
+        self.treeview.bind("<Up>", lambda e: self._move_table_selection(-1))
+        self.treeview.bind("<Down>", lambda e: self._move_table_selection(1))
+        self.treeview.bind("<Prior>", lambda e: self._move_table_selection(-self._table_visible))
+        self.treeview.bind("<Next>", lambda e: self._move_table_selection(self._table_visible))
+        self.treeview.bind("<Home>", lambda e: self._move_table_selection(-len(self._view_rows)))
+        self.treeview.bind("<End>", lambda e: self._move_table_selection(len(self._view_rows)))
 
         self.btn_refresh = tk.Button(
             right, text=self._tr("refresh"),
@@ -551,17 +1652,16 @@ class TreePackingGUI(tk.Tk):
 
         self.title(self._tr("title"))
         self.btn_load.config(text=self._tr("load_csv"))
+        self.btn_playback.config(text=self._tr("playback"))
         self.btn_render.config(text=self._tr("render"))
         self.btn_refresh.config(text=self._tr("refresh"))
         self.btn_clear.config(text=self._tr("clear"))
+        self.chk_heat.config(text=self._tr("heatmap"))
 
         self.file_label.config(text=self._tr("file_none") if not self.csv_path else os.path.basename(self.csv_path))
         self.lbl_hint.config(text=self._tr("hint"))
 
-        self.treeview.heading("group", text=self._tr("group"))
-        self.treeview.heading("n", text=self._tr("col_n"))
-        self.treeview.heading("score", text=self._tr("score"))
-        self.treeview.heading("side", text=self._tr("side"))
+        self._update_table_headings()
 
         if hasattr(self, "lbl_hover_title"):
             self.lbl_hover_title.config(text=self._tr("hover_title"))
@@ -576,8 +1676,33 @@ class TreePackingGUI(tk.Tk):
 
     # ---------- Filter ----------
     def _clear_filter(self):
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+            self._filter_after_id = None
         self.filter_var.set("")
-        self.refresh_group_table()
+        self._apply_filter()
+
+    def _schedule_filter(self, delay_ms=150):
+        # debounce: only the last keystroke within `delay_ms` triggers filtering
+        if self._filter_after_id is not None:
+            self.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.after(delay_ms, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_after_id = None
+        flt = (self.filter_var.get() or "").strip().lower()
+        if flt == self._view_filter:
+            return
+
+        if self._view_filter is not None and self._view_filter in flt:
+            # narrowing the filter: new matches are a subset of the current view
+            source = self._view_rows
+        else:
+            source = self._sorted_view()
+        self._view_rows = [r for r in source if flt in r["needle"]] if flt else list(source)
+        self._view_filter = flt
+        self._table_offset = 0
+        self._paint_table()
 
     # ---------- Slider / Entry sync ----------
     def _on_scale_move(self, val):
@@ -616,57 +1741,186 @@ class TreePackingGUI(tk.Tk):
         try:
             df = pd.read_csv(path)
             total, group_scores, group_side = compute_scores(df)
+            group_gain = {g: r["gain"] for g, r in rotation_analysis(df).items()}
 
             self.csv_path = path
             self.df_raw = df
             self.total_score = total
             self.group_scores = group_scores
             self.group_side = group_side
+            self.group_gain = group_gain
 
             self.file_label.config(text=os.path.basename(path))
             self.lbl_total.config(text=self._tr("total") + f"{self.total_score:.12f}")
 
+            self._rebuild_group_rows()
             self.refresh_group_table()
             messagebox.showinfo(self._tr("ok"), self._tr("loaded"))
         except Exception as e:
             messagebox.showerror(self._tr("load_fail"), str(e))
 
     def refresh_group_table(self):
-        for item in self.treeview.get_children():
-            self.treeview.delete(item)
-
+        flt = (self.filter_var.get() or "").strip().lower()
+        rows = self._sorted_view()
+        self._view_rows = [r for r in rows if flt in r["needle"]] if flt else list(rows)
+        self._view_filter = flt
+        self._table_offset = min(self._table_offset, max(0, len(self._view_rows) - self._table_visible))
+        self._paint_table()
+
+    def _rebuild_group_rows(self):
+        """Precomputes the formatted table rows and their sort keys (once per load)."""
+        self._group_rows = []
+        self._sorted_rows = {}
+        self._view_filter = None
+        self._table_offset = 0
         if not self.group_scores:
-            self.lbl_showing.config(text=self._tr("showing", shown=0, total=0))
             return
 
-        flt = (self.filter_var.get() or "").strip().lower()
-        all_groups = list(self.group_scores.keys())
-        total = len(all_groups)
-
-        def group_key(g):
-            try:
-                return int(g)
-            except Exception:
-                return 10**9
-
-        groups_sorted = sorted(all_groups, key=group_key)
-        if flt:
-            groups_sorted = [g for g in groups_sorted if flt in str(g).lower()]
-
-        shown = len(groups_sorted)
-        self.lbl_showing.config(text=self._tr("showing", shown=shown, total=total))
-
-        for idx, g in enumerate(groups_sorted):
-            n = int(g) if g.isdigit() else "-"
-            sc = self.group_scores[g]
+        for g, sc in self.group_scores.items():
             side = self.group_side.get(g, None)
             side_txt = f"{side:.6f}" if side is not None else "-"
+            gain = (self.group_gain or {}).get(g, None)
+            gain_txt = f"{gain:.9f}" if gain is not None else "-"
+            n = int(g) if g.isdigit() else "-"
+            self._group_rows.append({
+                "group": g,
+                "needle": str(g).lower(),
+                "values": (g, n, f"{sc:.12f}", side_txt, gain_txt),
+                "key_group": (int(g), g) if g.isdigit() else (10**9, g),
+                "key_score": sc,
+                "key_side": side if side is not None else float("inf"),
+                "key_gain": gain if gain is not None else float("-inf"),
+            })
+
+    def _sorted_view(self):
+        col = "group" if self._sort_col == "n" else self._sort_col
+        rows = self._sorted_rows.get(col)
+        if rows is None:
+            rows = sorted(self._group_rows, key=lambda r: r["key_" + col])
+            self._sorted_rows[col] = rows
+        return rows[::-1] if self._sort_reverse else rows
+
+    def _sort_table(self, col):
+        if col == self._sort_col:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_col = col
+            self._sort_reverse = False
+        self._update_table_headings()
+
+        # re-order the current (filtered) view without re-filtering every group
+        keep = {id(r) for r in self._view_rows}
+        self._view_rows = [r for r in self._sorted_view() if id(r) in keep]
+        self._table_offset = 0
+        self._paint_table()
+
+    def _update_table_headings(self):
+        labels = {"group": "group", "n": "col_n", "score": "score", "side": "side", "gain": "gain"}
+        for col, key in labels.items():
+            text = self._tr(key)
+            if col == self._sort_col:
+                text += " ▼" if self._sort_reverse else " ▲"
+            self.treeview.heading(col, text=text, command=lambda c=col: self._sort_table(c))
+
+    def _paint_table(self):
+        """Writes the visible window of `_view_rows` into the pooled Treeview items."""
+        total = len(self._group_rows)
+        shown = len(self._view_rows)
+        self.lbl_showing.config(text=self._tr("showing", shown=shown, total=total))
 
-            tag = "odd" if idx % 2 else "even"
-            self.treeview.insert("", tk.END, values=(g, n, f"{sc:.12f}", side_txt), tags=(tag,))
-
-        self.treeview.tag_configure("even", background="#FFF1FA")
-        self.treeview.tag_configure("odd", background="#EAF4FF")
+        visible = self._table_visible
+        while len(self._table_pool) < visible:
+            self._table_pool.append(self.treeview.insert("", tk.END, values=("", "", "", "", "")))
+
+        start = self._table_offset
+        selected_iid = None
+        for slot, iid in enumerate(self._table_pool):
+            idx = start + slot
+            if slot < visible and idx < shown:
+                row = self._view_rows[idx]
+                tag = "odd" if idx % 2 else "even"
+                self.treeview.item(iid, values=row["values"], tags=(tag,))
+                self.treeview.move(iid, "", slot)
+                if row["group"] == self._table_selected:
+                    selected_iid = iid
+            else:
+                self.treeview.detach(iid)
+
+        # pool items are reused for other groups: re-attach the selection to its group
+        if selected_iid is not None:
+            if self.treeview.selection() != (selected_iid,):
+                self.treeview.selection_set(selected_iid)
+            self.treeview.focus(selected_iid)
+        elif self.treeview.selection():
+            self.treeview.selection_remove(self.treeview.selection())
+
+        if shown <= visible:
+            self.table_sb.set(0.0, 1.0)
+        else:
+            self.table_sb.set(start / shown, min(1.0, (start + visible) / shown))
+
+    def _scroll_table_to(self, offset):
+        offset = max(0, min(int(offset), len(self._view_rows) - self._table_visible))
+        if offset != self._table_offset:
+            self._table_offset = offset
+            self._paint_table()
+
+    def _scroll_table_by(self, rows):
+        self._scroll_table_to(self._table_offset + rows)
+        return "break"
+
+    def _on_table_scroll(self, action, value, unit=None):
+        if action == "moveto":
+            self._scroll_table_to(round(float(value) * len(self._view_rows)))
+        elif action == "scroll":
+            step = self._table_visible if unit == "pages" else 1
+            self._scroll_table_by(int(value) * step)
+
+    def _on_table_wheel(self, event):
+        return self._scroll_table_by(-3 if event.delta > 0 else 3)
+
+    def _on_table_select(self, _evt):
+        # only user selections are recorded; repaints that scroll the group out of view keep it
+        sel = self.treeview.selection()
+        if sel:
+            vals = self.treeview.item(sel[0], "values")
+            if vals:
+                self._table_selected = str(vals[0])
+
+    def _move_table_selection(self, delta):
+        """Moves the selection by `delta` rows of the view, scrolling it into the window."""
+        if not self._view_rows:
+            return "break"
+        groups = [r["group"] for r in self._view_rows]
+        if self._table_selected in groups:
+            idx = groups.index(self._table_selected) + delta
+        else:
+            idx = self._table_offset if delta > 0 else self._table_offset + self._table_visible - 1
+        idx = max(0, min(idx, len(groups) - 1))
+        self._table_selected = groups[idx]
+
+        offset = self._table_offset
+        if idx < offset:
+            offset = idx
+        elif idx >= offset + self._table_visible:
+            offset = idx - self._table_visible + 1
+        self._table_offset = max(0, min(offset, len(groups) - self._table_visible))
+        self._paint_table()
+        return "break"
+
+    def _on_table_configure(self, event):
+        # fit the item pool to the widget height so no rows are wasted or clipped
+        row_h = int(ttk.Style(self).lookup("Treeview", "rowheight"))  # set in _build_style
+        heading_h = row_h  # until a row is mapped and can be measured
+        if self._table_pool:
+            bbox = self.treeview.bbox(self._table_pool[0])
+            if bbox:
+                heading_h = bbox[1]
+        visible = max(1, (event.height - heading_h) // row_h)
+        if visible != self._table_visible:
+            self._table_visible = visible
+            self._table_offset = min(self._table_offset, max(0, len(self._view_rows) - visible))
+            self._paint_table()
 
     def _on_table_double_click(self, _evt):
         sel = self.treeview.selection()
@@ -709,14 +1963,7 @@ class TreePackingGUI(tk.Tk):
             df_group_raw = raw_tmp[raw_tmp["tree_count_group"] == group].copy()
             raw_map = {str(r["id"]): r.to_dict() for _, r in df_group_raw.iterrows()}
 
-            trees = [ChristmasTree(r["x"], r["y"], r["deg"]) for _, r in df_group.iterrows()]
-            polys_scaled = [t.polygon for t in trees]
-
-            bounds = unary_union(polys_scaled).bounds
-            minx, miny, maxx, maxy = bounds
-            width = maxx - minx
-            height = maxy - miny
-            side_scaled = max(width, height)
+            polys_scaled, bounds, side_scaled = _group_geometry(df_group)
 
             group_score = self.group_scores.get(group)
             if group_score is None:
@@ -724,12 +1971,24 @@ class TreePackingGUI(tk.Tk):
                     (Decimal(side_scaled) ** 2) / (scale_factor ** 2) / Decimal(len(df_group))
                 )
 
+            clearance = None
+            face_colors = None
+            if self.heat_var.get():
+                clearance = group_clearance(polys_scaled, square=(bounds[0], bounds[1], side_scaled))
+                face_colors, vmax = clearance_colors(clearance["gap"])
+
             # Redraw
-            self.ax.clear()
-            self.ax.set_title(f"N={n} (group {group}) Packing", fontsize=12, fontweight="bold")
-            self.ax.set_aspect("equal", adjustable="box")
-            self.ax.set_facecolor(self.C["plot_bg"])
-            self.ax.grid(True, alpha=0.35)
+            patches = draw_packing(
+                self.ax, polys_scaled, bounds, side_scaled,
+                f"N={n} (group {group}) Packing",
+                face_colors=face_colors,
+            )
+            if clearance is not None:
+                self.ax.text(
+                    0.01, 0.01, f"{self._tr('gap')}: 0 → {vmax:.6f}",
+                    transform=self.ax.transAxes, fontsize=9, color=self.C["text"], zorder=20,
+                    bbox=dict(boxstyle="round,pad=0.3", fc="white", ec=self.C["accent3"], alpha=0.9),
+                )
 
             # reset hover
             self._hover_items = []
@@ -737,25 +1996,8 @@ class TreePackingGUI(tk.Tk):
             self._anno.set_visible(False)
             self._set_hover_text(self._tr("hover_ph"))
 
-            # draw trees
-            for i, ((_, r), poly) in enumerate(zip(df_group.iterrows(), polys_scaled), start=1):
-                x, y = poly.exterior.xy
-                x = [v / float(scale_factor) for v in x]
-                y = [v / float(scale_factor) for v in y]
-
-                color = self.TREE_COLORS[(i - 1) % len(self.TREE_COLORS)]
-                patch = MplPolygon(list(zip(x, y)), closed=True)
-                patch.set_facecolor(color)
-                patch.set_edgecolor("#FFFFFF")
-                patch.set_alpha(0.48)
-                patch.set_linewidth(1.6)
-                patch.set_zorder(3)
-                patch.set_path_effects([
-                    pe.SimplePatchShadow(offset=(2, -2), alpha=0.25),
-                    pe.Normal()
-                ])
-                self.ax.add_patch(patch)
-
+            # hover metadata per tree
+            for i, ((_, r), patch) in enumerate(zip(df_group.iterrows(), patches), start=1):
                 rid = str(r["id"])
                 meta = {
                     "idx": i,
@@ -763,27 +2005,12 @@ class TreePackingGUI(tk.Tk):
                     "row_clean": r.to_dict(),
                     "row_raw": raw_map.get(rid, None),
                 }
+                if clearance is not None:
+                    meta["gap"] = float(clearance["gap"][i - 1])
+                    meta["edge"] = float(clearance["edge"][i - 1])
                 orig = {"alpha": 0.48, "lw": 1.6, "ec": "#FFFFFF", "z": 3}
                 self._hover_items.append({"patch": patch, "meta": meta, "orig": orig})
 
-            # Bounding square
-            side = side_scaled
-            sq = Polygon(
-                [(minx, miny), (minx + side, miny), (minx + side, miny + side), (minx, miny + side)]
-            )
-            sx, sy = sq.exterior.xy
-            sx = [v / float(scale_factor) for v in sx]
-            sy = [v / float(scale_factor) for v in sy]
-            self.ax.plot(sx, sy, linewidth=2.6, color=self.C["accent2"], zorder=2)
-
-            # View limits with padding
-            pad = float(Decimal(side) / scale_factor) * 0.08 + 0.05
-            minx_f = float(Decimal(minx) / scale_factor) - pad
-            miny_f = float(Decimal(miny) / scale_factor) - pad
-            side_f = float(Decimal(side) / scale_factor) + 2 * pad
-            self.ax.set_xlim(minx_f, minx_f + side_f)
-            self.ax.set_ylim(miny_f, miny_f + side_f)
-
             self.canvas.draw()
 
             self.lbl_current.config(text=self._tr("current") + f"{group_score:.12f}   (N={n})")
@@ -792,6 +2019,53 @@ class TreePackingGUI(tk.Tk):
         except Exception as e:
             messagebox.showerror(self._tr("render_fail"), str(e))
 
+    def on_playback(self):
+        directory = filedialog.askdirectory(title=self._tr("playback"))
+        if not directory:
+            return
+
+        try:
+            n = int(self.n_var.get().strip())
+            group = f"{n:03d}"
+            paths = snapshot_paths(directory)
+            if self._timeline is not None and self._timeline_dir == directory and self._timeline.paths == paths:
+                PlaybackWindow(self, self._timeline, group)
+                return
+        except Exception as e:
+            messagebox.showerror(self._tr("playback_fail"), str(e))
+            return
+
+        # parse the snapshots off the Tk thread; poll for the result
+        result = {}
+
+        def load():
+            try:
+                result["timeline"] = SnapshotTimeline(paths)
+            except Exception as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=load, daemon=True)
+        worker.start()
+        self.config(cursor="watch")
+        self.btn_playback.config(state=tk.DISABLED)
+
+        def poll():
+            if worker.is_alive():
+                self.after(100, poll)
+                return
+            self.config(cursor="")
+            self.btn_playback.config(state=tk.NORMAL)
+            try:
+                if "error" in result:
+                    raise result["error"]
+                self._timeline = result["timeline"]
+                self._timeline_dir = directory
+                PlaybackWindow(self, self._timeline, group)
+            except Exception as e:
+                messagebox.showerror(self._tr("playback_fail"), str(e))
+
+        poll()
+
     # ---------- Hover ----------
     def _on_motion(self, event):
         if event.inaxes != self.ax or not self._hover_items:
@@ -827,7 +2101,10 @@ class TreePackingGUI(tk.Tk):
         keys = [k for k in keys_first if k in row] + [k for k in row.keys() if k not in keys_first and k != "tree_count_group"]
 
         header = f"Tree #{meta['idx']} (CSV row)" if self.lang == "en" else f"第 {meta['idx']} 棵（CSV 行数据）"
-        full_text = "\n".join([header] + [f"{k}: {row.get(k, '')}" for k in keys])
+        lines = [header] + [f"{k}: {row.get(k, '')}" for k in keys]
+        if "gap" in meta:
+            lines += [f"{self._tr('gap')}: {meta['gap']:.9f}", f"{self._tr('edge')}: {meta['edge']:.9f}"]
+        full_text = "\n".join(lines)
         self._set_hover_text(full_text)
 
         # compact tooltip
@@ -864,10 +2141,642 @@ class TreePackingGUI(tk.Tk):
         self.canvas.draw_idle()
 
 
-def main():
-    app = TreePackingGUI()
-    app.mainloop()
+class PlaybackWindow(tk.Toplevel):
+    """
+    Steps through the snapshots of one group. Artists are created once and only
+    their data changes per frame; frames are blitted over a cached background.
+    """
+
+    TARGET_FPS = 30
+
+    def __init__(self, master, timeline, group):
+        super().__init__(master)
+        self.C = master.C
+        self._tr = master._tr
+        self.frames = timeline.group_frames(group)
+        self.names = [os.path.basename(timeline.paths[k]) for k in self.frames["snapshots"]]
+        self.total = len(self.names)
+
+        self.title(self._tr("playback_title", group=group))
+        self.geometry("1180x680")
+        self.configure(bg=self.C["bg"])
+
+        self._k = 0
+        self._playing = False
+        self._after_id = None
+        self._bg = None
+        self._syncing = False
+        self._fps = 0.0
+        self._last_tick = None
+
+        self._build(group)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _build(self, group):
+        fr = self.frames
+        verts, bounds = fr["verts"], fr["bounds"]
+        n = verts.shape[1]
+
+        fig = Figure(figsize=(11.0, 5.8), dpi=100, facecolor=self.C["plot_bg"])
+        self.fig = fig
+        self.ax = fig.add_subplot(1, 2, 1)
+        self.ax_sc = fig.add_subplot(1, 2, 2)
+
+        # packing axes: fixed limits covering every frame, so the background stays valid
+        lo = bounds[:, :2].min(axis=0)
+        hi = bounds[:, 2:].max(axis=0)
+        span = float(max(hi - lo))
+        pad = span * 0.08 + 0.05
+        cx, cy = (lo + hi) / 2
+        self.ax.set_xlim(cx - span / 2 - pad, cx + span / 2 + pad)
+        self.ax.set_ylim(cy - span / 2 - pad, cy + span / 2 + pad)
+        self.ax.set_title(f"N={n} (group {group})", fontsize=12, fontweight="bold")
+        self.ax.set_aspect("equal", adjustable="box")
+        self.ax.set_facecolor(self.C["plot_bg"])
+        self.ax.grid(True, alpha=0.35)
+
+        colors = [TREE_COLORS[i % len(TREE_COLORS)] for i in range(n)]
+        self.trees = PolyCollection(
+            verts[0], closed=True, facecolors=colors, edgecolors="#FFFFFF",
+            linewidths=0.8, alpha=0.55, zorder=3, animated=True,
+        )
+        self.ax.add_collection(self.trees)
+        (self.square,) = self.ax.plot([], [], linewidth=2.6, color=self.C["accent2"], zorder=2, animated=True)
+
+        # score / side over the timeline (static), with an animated cursor
+        x = np.arange(self.total)
+        self.ax_sc.plot(x, fr["score"], color=self.C["accent"], linewidth=1.8, label="score")
+        self.ax_sc.set_xlabel("snapshot")
+        self.ax_sc.set_ylabel("score", color=self.C["accent"])
+        self.ax_sc.set_facecolor(self.C["plot_bg"])
+        self.ax_sc.grid(True, alpha=0.35)
+        self.ax_side = self.ax_sc.twinx()
+        self.ax_side.plot(x, fr["side"], color=self.C["accent2"], linewidth=1.4, linestyle="--", label="side")
+        self.ax_side.set_ylabel("side", color=self.C["accent2"])
+        self.cursor = self.ax_sc.axvline(0, color=self.C["hl"], linewidth=1.6, animated=True)
+        (self.cursor_dot,) = self.ax_sc.plot([], [], "o", color=self.C["hl"], animated=True)
+        fig.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(fig, master=self)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+        bar = tk.Frame(self, bg=self.C["card"])
+        bar.pack(fill=tk.X, padx=10, pady=8)
+        self.btn_play = tk.Button(
+            bar, text=self._tr("play"),
+            bg=self.C["accent"], fg="white", activebackground="#FF2D8C",
+            relief="flat", padx=12, pady=6, font=("Segoe UI", 10, "bold"),
+            command=self._toggle_play
+        )
+        self.btn_play.pack(side=tk.LEFT)
+        self.frame_scale = ttk.Scale(bar, from_=0, to=max(0, self.total - 1), orient=tk.HORIZONTAL,
+                                     command=self._on_scale)
+        self.frame_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+        # per-frame text lives in a Tk label: rendering it in the figure costs more than the trees
+        self.lbl_frame = tk.Label(bar, bg=self.C["card"], fg=self.C["text"], width=58, anchor="w",
+                                  font=("Consolas", 10))
+        self.lbl_frame.pack(side=tk.LEFT)
+        self.lbl_fps = tk.Label(bar, bg=self.C["card"], fg=self.C["muted"], width=8)
+        self.lbl_fps.pack(side=tk.LEFT)
+
+        self._update_artists(0)
+
+    # ----- drawing -----
+    def _on_draw(self, _evt):
+        # full redraw (first show / resize): cache everything static, then overlay the frame
+        self._bg = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self.square)
+        self.ax.draw_artist(self.trees)
+        self.ax_sc.draw_artist(self.cursor)
+        self.ax_sc.draw_artist(self.cursor_dot)
+
+    def _update_artists(self, k):
+        fr = self.frames
+        self.trees.set_verts(fr["verts"][k])
+        minx, miny = fr["bounds"][k, 0], fr["bounds"][k, 1]
+        side = fr["side"][k]
+        self.square.set_data(
+            [minx, minx + side, minx + side, minx, minx],
+            [miny, miny, miny + side, miny + side, miny],
+        )
+        self.cursor.set_xdata([k, k])
+        self.cursor_dot.set_data([k], [fr["score"][k]])
+        self.lbl_frame.config(
+            text=f"{self._tr('frame', k=k + 1, total=self.total)}  {self.names[k]}  "
+                 f"score={fr['score'][k]:.9f}  side={side:.6f}"
+        )
+
+    def show_frame(self, k):
+        self._k = int(k) % self.total
+        self._update_artists(self._k)
+        if self._bg is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._bg)
+        self._draw_animated()
+        self.canvas.blit(self.ax.bbox)
+        self.canvas.blit(self.ax_sc.bbox)
+
+    # ----- playback -----
+    def _toggle_play(self):
+        self._playing = not self._playing
+        self.btn_play.config(text=self._tr("pause") if self._playing else self._tr("play"))
+        if self._playing:
+            self._last_tick = None
+            self._tick()
+        elif self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _tick(self):
+        t0 = time.perf_counter()
+        if self._last_tick is not None:
+            dt = t0 - self._last_tick
+            self._fps = 1.0 / dt if not self._fps else 0.9 * self._fps + 0.1 / dt
+            self.lbl_fps.config(text=self._tr("fps", fps=self._fps))
+        self._last_tick = t0
+
+        self.show_frame(self._k + 1)
+        self._syncing = True
+        try:
+            self.frame_scale.set(self._k)
+        finally:
+            self._syncing = False
+
+        spent_ms = (time.perf_counter() - t0) * 1000
+        delay = max(1, int(1000 / self.TARGET_FPS - spent_ms))
+        self._after_id = self.after(delay, self._tick)
+
+    def _on_scale(self, val):
+        if self._syncing:
+            return
+        self.show_frame(int(round(float(val))))
+
+    def _on_close(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        self.destroy()
+
+
+# ---------------- Scoring daemon ----------------
+def _score_group_job(args):
+    """Process-pool worker: ("ok", group_score str, side) or ("error", message, None)."""
+    group, x_str, y_str, deg_str, engine = args
+    try:
+        group_score, side = score_group(group, x_str, y_str, deg_str, engine=engine)
+        return "ok", str(group_score), side
+    except ParticipantVisibleError as e:
+        return "error", str(e), None
+
+
+class ScoringService:
+    """
+    Long-lived scorer: a warm process pool plus an in-memory per-group result cache.
+
+    The cache key is (engine, group, digest of the group's x/y/deg strings), so an
+    unchanged group is never recomputed, whichever request it arrives in.
+    The last successfully scored submission is kept so callers can send per-group deltas;
+    updates to it are serialized, so concurrent deltas never start from the same snapshot.
+    """
+
+    def __init__(self, engine="shapely", workers=None, cache_size=8192):
+        if engine not in SCORING_ENGINES:
+            raise ValueError(f"unknown engine {engine!r}, expected one of {SCORING_ENGINES}")
+        self.engine = engine
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._cache = OrderedDict()
+        self._groups = {}   # group -> (x_str, y_str, deg_str) tuples of the current submission
+        self._lock = threading.Lock()              # cache, counters, latency
+        self._submission_lock = threading.Lock()   # read-modify-write of self._groups
+        self._pool_lock = threading.Lock()
+        self.pool_restarts = 0
+        self._latency = {}  # endpoint -> deque of seconds
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._warm_up()
+
+    def _warm_up(self):
+        # start every worker and fill its template cache for the most common angles
+        job = ("001", ["0"], ["0"], ["0"], self.engine)
+        list(self._pool.map(_score_group_job, [job] * self.workers))
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    def _restart_pool(self, broken):
+        """Replaces a broken pool (a worker died); concurrent callers restart it only once."""
+        with self._pool_lock:
+            if self._pool is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self.pool_restarts += 1
+            self._warm_up()
+
+    # ----- scoring -----
+    @staticmethod
+    def _digest(x_str, y_str, deg_str):
+        h = hashlib.blake2b(digest_size=16)
+        for col in (x_str, y_str, deg_str):
+            h.update("\x1f".join(col).encode())
+            h.update(b"\x1e")
+        return h.hexdigest()
+
+    def _score_groups(self, groups):
+        """Scores the given {group: (x_str, y_str, deg_str)} using the cache and the pool."""
+        results = {}
+        pending = {}
+        with self._lock:
+            for g, cols in groups.items():
+                key = (self.engine, g, self._digest(*cols))
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[g] = self._cache[key]
+                    self.cache_hits += 1
+                else:
+                    pending[g] = key
+                    self.cache_misses += 1
+
+        pool = self._pool
+        try:
+            futures = {
+                g: pool.submit(_score_group_job, (g, *groups[g], self.engine))
+                for g in pending
+            }
+            computed = {g: f.result() for g, f in futures.items()}
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            raise
+
+        with self._lock:
+            for g, res in computed.items():
+                self._cache[pending[g]] = res
+                results[g] = res
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results, len(pending)
+
+    def _summarize(self, results, computed):
+        errors = {g: r[1] for g, r in results.items() if r[0] == "error"}
+        if errors:
+            first = sorted(errors)[0]
+            raise ParticipantVisibleError(errors[first])
+
+        total = sum((Decimal(results[g][1]) for g in results), Decimal("0.0"))
+        return {
+            "total_score": float(total),
+            "groups": {
+                g: {"score": float(Decimal(results[g][1])), "side": results[g][2]}
+                for g in sorted(results)
+            },
+            "computed": computed,
+            "cached": len(results) - computed,
+        }
+
+    def score_submission(self, csv_bytes: bytes):
+        """Scores a whole submission CSV and makes it the current submission."""
+        parsed = parse_submission(pd.read_csv(io.BytesIO(csv_bytes)))
+        groups = {
+            g: (parsed.x_str[idx].tolist(), parsed.y_str[idx].tolist(), parsed.deg_str[idx].tolist())
+            for g, idx in parsed.group_slices().items()
+        }
+        results, computed = self._score_groups(groups)
+        summary = self._summarize(results, computed)
+        with self._submission_lock:
+            self._groups = groups
+        return summary
+
+    def score_delta(self, delta: dict):
+        """
+        Replaces groups of the current submission and rescores it.
+        delta: {group: [[id, x, y, deg], ...]} with 's'-prefixed values; an empty list removes the group.
+        """
+        changed = {}
+        removed = []
+        for g, rows in delta.items():
+            if not rows:
+                removed.append(str(g))
+                continue
+            df = pd.DataFrame(rows, columns=["id", "x", "y", "deg"])
+            parsed = parse_submission(df)
+            for pg, idx in parsed.group_slices().items():
+                if pg != str(g):
+                    raise ParticipantVisibleError(f"delta group {g} 含有其他组的 id（{pg}）。")
+                changed[pg] = (parsed.x_str[idx].tolist(), parsed.y_str[idx].tolist(), parsed.deg_str[idx].tolist())
+
+        # copy -> score -> store under one lock: a concurrent /delta or /score
+        # either sees this update or is applied after it, never alongside
+        with self._submission_lock:
+            groups = dict(self._groups)
+            for g in removed:
+                groups.pop(g, None)
+            groups.update(changed)
+
+            results, computed = self._score_groups(groups)
+            summary = self._summarize(results, computed)
+            self._groups = groups
+        return summary
+
+    # ----- stats -----
+    def record_latency(self, endpoint, seconds):
+        with self._lock:
+            self._latency.setdefault(endpoint, deque(maxlen=10000)).append(seconds)
+
+    def stats(self):
+        with self._lock:
+            latency = {k: np.array(v) for k, v in self._latency.items()}
+            out = {
+                "engine": self.engine,
+                "workers": self.workers,
+                "cache": {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self._cache)},
+                "groups": len(self._groups),
+                "pool_restarts": self.pool_restarts,
+            }
+        out["latency_ms"] = {
+            k: {
+                "count": int(len(v)),
+                "p50": float(np.percentile(v, 50) * 1000),
+                "p90": float(np.percentile(v, 90) * 1000),
+                "p99": float(np.percentile(v, 99) * 1000),
+                "max": float(v.max() * 1000),
+            }
+            for k, v in latency.items() if len(v)
+        }
+        return out
+
+
+class _ScoringRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /score   body: submission CSV bytes
+    POST /delta   body: JSON {"groups": {group: [[id, x, y, deg], ...]}}
+    GET  /stats   latency percentiles and cache counters
+    """
+
+    service = None  # set by make_scoring_server
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _timed(self, endpoint, fn):
+        t0 = time.perf_counter()
+        try:
+            status, payload = 200, fn()
+        except ParticipantVisibleError as e:
+            status, payload = 422, {"error": str(e)}
+        except (ValueError, KeyError, TypeError) as e:
+            # malformed request body (bad JSON / CSV, missing fields)
+            status, payload = 400, {"error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            # service-side failure, e.g. a dead worker (the pool has been rebuilt)
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        elapsed = time.perf_counter() - t0
+        self.service.record_latency(endpoint, elapsed)
+        payload["elapsed_ms"] = elapsed * 1000
+        self._send_json(status, payload)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.service.stats())
+        elif self.path == "/health":
+            self._send_json(200, {"ok": True})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+        if self.path == "/score":
+            self._timed("/score", lambda: self.service.score_submission(body))
+        elif self.path == "/delta":
+            self._timed("/delta", lambda: self.service.score_delta(json.loads(body)["groups"]))
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+
+def make_scoring_server(service: ScoringService, host="127.0.0.1", port=8765):
+    """HTTP server bound to `host:port` (port 0 picks a free port) serving `service`."""
+    handler = type("ScoringRequestHandler", (_ScoringRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def request_scores(url: str, data, path="/score", timeout=300):
+    """Small client for the scoring daemon: CSV bytes for /score, a dict for /delta, None for GET."""
+    import urllib.error
+    import urllib.request
+
+    if data is None:
+        req = urllib.request.Request(url.rstrip("/") + path)
+    else:
+        body = json.dumps({"groups": data}).encode() if isinstance(data, dict) else data
+        req = urllib.request.Request(url.rstrip("/") + path, data=body, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read())
+
+
+# ---------------- CLI ----------------
+def _build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Santa 2025 tree packing scorer / visualizer. Without a command, starts the GUI."
+    )
+    sub = parser.add_subparsers(dest="command")
+
+    p_export = sub.add_parser("export", help="render groups to PNG/SVG files without the GUI")
+    p_export.add_argument("csv", help="submission CSV")
+    p_export.add_argument("-o", "--out-dir", default="export", help="output directory (default: export)")
+    p_export.add_argument("-f", "--format", choices=EXPORT_FORMATS, default="png")
+    p_export.add_argument("-g", "--groups", default=None, help='group range, e.g. "1-50" or "2,5,10-12" (default: all)')
+    p_export.add_argument("-j", "--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    p_export.add_argument("--dpi", type=int, default=100)
+
+    p_report = sub.add_parser("report", help="score a submission and print the per-group table")
+    p_report.add_argument("csv", help="submission CSV")
+    p_report.add_argument("-e", "--engine", choices=SCORING_ENGINES, default="shapely", help="collision engine")
+    p_report.add_argument("-o", "--output", default=None, help="write the table as CSV instead of printing it")
+    p_report.add_argument("--clearance", action="store_true", help="add per-group clearance columns (gaps to neighbours / square edge)")
+    p_report.add_argument("--profile", action="store_true", help="print phase timings and cache counters")
+
+    p_verify = sub.add_parser("verify-engines", help="cross-check the SAT engine against shapely on random groups")
+    p_verify.add_argument("-t", "--trials", type=int, default=500)
+    p_verify.add_argument("-n", "--trees", type=int, default=30)
+    p_verify.add_argument("-s", "--seed", type=int, default=0)
+
+    p_rotate = sub.add_parser("rotate", help="rotating-calipers analysis: score gain from rotating each group")
+    p_rotate.add_argument("csv", help="submission CSV")
+    p_rotate.add_argument("-o", "--output", default=None, help="write the rotated submission to this CSV")
+    p_rotate.add_argument("--min-gain", type=float, default=0.0, help="only rotate groups gaining more than this")
+    p_rotate.add_argument("--top", type=int, default=20, help="number of groups to list (default: 20)")
+
+    p_serve = sub.add_parser("serve", help="run a warm local scoring daemon over HTTP")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("-p", "--port", type=int, default=8765)
+    p_serve.add_argument("-e", "--engine", choices=SCORING_ENGINES, default="shapely", help="collision engine")
+    p_serve.add_argument("-j", "--workers", type=int, default=None, help="process pool size (default: CPU count)")
+
+    p_bench = sub.add_parser("bench-parse", help="benchmark submission parsing (legacy vs vectorized)")
+    p_bench.add_argument("csv", help="submission CSV")
+    p_bench.add_argument("-r", "--repeat", type=int, default=5)
+
+    return parser
+
+
+def _cmd_report(args):
+    t0 = time.perf_counter()
+    df = pd.read_csv(args.csv)
+    t_read = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    total, group_scores, group_side = compute_scores(df, engine=args.engine)
+    seconds = time.perf_counter() - t0
+
+    table = pd.DataFrame({
+        "group": list(group_scores.keys()),
+        "n": [int(g) if g.isdigit() else None for g in group_scores],
+        "score": list(group_scores.values()),
+        "side": [group_side[g] for g in group_scores],
+    })
+
+    t_clear = None
+    if args.clearance:
+        t0 = time.perf_counter()
+        summary = clearance_summary(compute_clearance(df))
+        t_clear = time.perf_counter() - t0
+        for col in ("min_gap", "mean_gap", "max_gap", "min_edge"):
+            table[col] = [summary[g][col] for g in group_scores]
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        print(table.to_string(index=False, float_format=lambda v: f"{v:.12f}"))
+    print(f"total score: {total:.12f}")
+    print(f"scored {len(table)} group(s) with engine '{args.engine}' in {seconds:.3f}s")
+    if args.profile:
+        cache = template_cache_info()
+        print("profile:")
+        print(f"  read csv        {t_read * 1000:10.1f} ms")
+        print(f"  compute_scores  {seconds * 1000:10.1f} ms")
+        if t_clear is not None:
+            print(f"  clearance       {t_clear * 1000:10.1f} ms")
+        print(
+            f"  template cache  hits={cache['hits']} misses={cache['misses']} "
+            f"size={cache['size']}/{cache['maxsize']} hit_rate={cache['hit_rate']:.1%}"
+        )
+    return 0
+
+
+def _cmd_verify_engines(args):
+    res = verify_sat_engine(trials=args.trials, trees=args.trees, seed=args.seed)
+    print(f"checked {res['pairs']} tree pairs in {res['layouts']} layouts, "
+          f"{len(res['mismatches'])} layout(s) disagree")
+    for k, pairs in res["mismatches"][:10]:
+        print(f"  layout {k}: pairs {pairs[:10]}")
+    return 1 if res["mismatches"] else 0
+
+
+def _cmd_rotate(args):
+    df = pd.read_csv(args.csv)
+    t0 = time.perf_counter()
+    analysis = rotation_analysis(df)
+    seconds = time.perf_counter() - t0
+
+    table = pd.DataFrame([
+        {"group": g, "side": r["side"], "best_side": r["best_side"], "angle_deg": r["angle_deg"], "gain": r["gain"]}
+        for g, r in analysis.items()
+    ]).sort_values("gain", ascending=False)
+    print(table.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.9f}"))
+    print(f"potential total gain: {table['gain'].sum():.12f}")
+    print(f"analysed {len(table)} group(s) in {seconds:.3f}s")
+
+    if args.output:
+        out, applied = rotate_submission(df, analysis, min_gain=args.min_gain)
+        out.to_csv(args.output, index=False)
+        skipped = int((table["gain"] > args.min_gain).sum()) - len(applied)
+        print(f"wrote {args.output}: rotated {len(applied)} group(s)"
+              + (f", kept {skipped} unchanged (failed re-validation)" if skipped else ""))
+    return 0
+
+
+def _cmd_serve(args):
+    service = ScoringService(engine=args.engine, workers=args.workers)
+    server = make_scoring_server(service, host=args.host, port=args.port)
+    host, port = server.server_address[:2]
+    print(f"scoring daemon listening on http://{host}:{port} (engine '{args.engine}', "
+          f"{service.workers} worker(s)); Ctrl+C to stop", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+def _cmd_bench_parse(args):
+    df = pd.read_csv(args.csv)
+    timings = bench_parse(df, repeat=args.repeat)
+    for name, sec in timings.items():
+        print(f"{name:>10}: {sec * 1000:9.2f} ms  ({len(df) / sec:,.0f} rows/s)")
+    print(f"{'speedup':>10}: {timings['legacy'] / timings['vectorized']:9.2f}x")
+    return 0
+
+
+def _cmd_export(args):
+    df = pd.read_csv(args.csv)
+    groups = _parse_group_range(args.groups) if args.groups else None
+    stats = export_groups(df, args.out_dir, fmt=args.format, groups=groups, workers=args.workers, dpi=args.dpi)
+    print(
+        f"exported {stats['exported']} group(s) to {args.out_dir} "
+        f"in {stats['seconds']:.2f}s ({stats['groups_per_sec']:.1f} groups/s)"
+    )
+    return 0
+
+
+def main(argv=None):
+    args = _build_arg_parser().parse_args(argv)
+    if args.command is None:
+        app = TreePackingGUI()
+        app.mainloop()
+        return 0
+
+    try:
+        return _run_command(args)
+    except (ParticipantVisibleError, ValueError, OSError) as e:
+        # expected user errors (bad selection, invalid / overlapping file): no traceback
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+def _run_command(args):
+    if args.command == "export":
+        return _cmd_export(args)
+    if args.command == "report":
+        return _cmd_report(args)
+    if args.command == "verify-engines":
+        return _cmd_verify_engines(args)
+    if args.command == "rotate":
+        return _cmd_rotate(args)
+    if args.command == "serve":
+        return _cmd_serve(args)
+    if args.command == "bench-parse":
+        return _cmd_bench_parse(args)
+    raise ValueError(f"unknown command {args.command!r}")
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())